@@ -0,0 +1,50 @@
+import os
+import zlib
+import hashlib
+from sqlalchemy import select, delete, exists
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database import Game, GameBlob
+
+# --- 游戏代码的内容寻址存储 ---
+# 单文件游戏的 HTML 以 sha256 为键、zlib 压缩后存入 game_blobs，games 只保存哈希和大小；
+# 内容相同的上传共用同一行。上传、编辑和 games_repo 同步都通过这里写入。
+BLOB_COMPRESSION_LEVEL = int(os.environ.get("FUNAI_BLOB_COMPRESSION_LEVEL", "6"))
+
+def hash_content(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def put_blob(db: Session, content: str, content_hash: str = None) -> tuple:
+    """写入内容（已存在时跳过），返回 (hash, 未压缩字节数)；在调用方的事务中执行"""
+    raw = content.encode("utf-8")
+    content_hash = content_hash or hashlib.sha256(raw).hexdigest()
+    data = zlib.compress(raw, BLOB_COMPRESSION_LEVEL)
+    db.execute(
+        sqlite_insert(GameBlob)
+        .values(hash=content_hash, size=len(raw), compressed_size=len(data), data=data)
+        .on_conflict_do_nothing(index_elements=[GameBlob.hash])
+    )
+    return content_hash, len(raw)
+
+def blob_fields(db: Session, content: str, content_hash: str = None) -> dict:
+    """写入内容并返回 Game 上对应的字段，html_code 置空不再重复存储"""
+    content_hash, size = put_blob(db, content, content_hash)
+    return {"content_hash": content_hash, "content_size": size, "html_code": None}
+
+def read_blob(db: Session, content_hash: str) -> str:
+    data = db.execute(select(GameBlob.data).where(GameBlob.hash == content_hash)).scalar()
+    if data is None:
+        raise FileNotFoundError(f"blob {content_hash} not found")
+    return zlib.decompress(data).decode("utf-8")
+
+def release_blobs(db: Session, *hashes):
+    """删除已没有游戏引用的内容；在游戏删除或内容替换后调用"""
+    hashes = {content_hash for content_hash in hashes if content_hash}
+    if not hashes:
+        return
+    db.execute(
+        delete(GameBlob)
+        .where(GameBlob.hash.in_(hashes))
+        .where(~exists().where(Game.content_hash == GameBlob.hash))
+    )
@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import signal
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from database import SessionLocal, Game
+from content_cache import content_cache
+from response_cache import response_cache, category_tag
+from utils import load_game_html, directory_size
+from npm_cache import npm_cache
+from zip_ingest import safe_extract_zip, ZipLimitError
+
+# --- ZIP 上传后台构建队列 ---
+# 解压、npm 构建和校验都在后台线程中完成，上传请求只负责保存 ZIP 并返回任务ID。
+BUILD_WORKERS = int(os.environ.get("FUNAI_BUILD_WORKERS", "2"))
+# 单个任务（解压 + 构建）的最长耗时，超时后终止构建进程组
+BUILD_TIMEOUT = float(os.environ.get("FUNAI_BUILD_TIMEOUT", "600"))
+# 单个任务目录（含 node_modules）允许占用的最大磁盘空间
+BUILD_MAX_DISK_BYTES = int(os.environ.get("FUNAI_BUILD_MAX_DISK_BYTES", str(1024 * 1024 * 1024)))
+# 已结束的任务在内存中保留多久，供状态页查询
+BUILD_JOB_RETENTION = float(os.environ.get("FUNAI_BUILD_JOB_RETENTION", "3600"))
+# 服务关闭时等待正在执行的任务结束的最长时间
+BUILD_SHUTDOWN_TIMEOUT = float(os.environ.get("FUNAI_BUILD_SHUTDOWN_TIMEOUT", "10"))
+# 构建过程中检查磁盘占用的间隔
+DISK_CHECK_INTERVAL = 5.0
+
+# 在独立进程中运行构建，超时或超出磁盘限制时可以整组杀掉（包括 npm 启动的子进程）
+BUILD_RUNNER = (
+    "import json, sys\n"
+    "from tools.npm_build_helper import build_project\n"
+    "success, error_msg = build_project(sys.argv[1])\n"
+    "print(json.dumps({'success': bool(success), 'error': error_msg or ''}))\n"
+)
+
+class BuildError(Exception):
+    """构建任务失败，消息会展示给上传者"""
+
+def needs_build(directory: str) -> bool:
+    """检查目录是否包含需要构建的 Node.js 项目"""
+    return os.path.exists(os.path.join(directory, "package.json"))
+
+def find_build_output_dir(directory: str) -> str:
+    """查找构建输出目录 (dist, build, 或 out)"""
+    common_dirs = ['dist', 'build', 'out']
+    for dir_name in common_dirs:
+        dir_path = os.path.join(directory, dir_name)
+        if os.path.exists(dir_path) and os.path.isdir(dir_path):
+            return dir_name
+    return None
+
+class BuildJob:
+    def __init__(self, job_id: str, upload_dir: str, archive, game_fields: dict):
+        self.id = job_id
+        self.upload_dir = upload_dir
+        self.archive = archive      # 上传的 ZIP（已打开的临时文件），解压后关闭
+        self.game_fields = game_fields
+        self.future = None
+        self.process = None         # 正在运行的构建进程，关闭服务时整组终止
+        self.status = "queued"      # queued / extracting / building / validating / done / failed
+        self.progress = 0
+        self.message = "排队中"
+        self.game_id = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def update(self, status: str, progress: int, message: str):
+        self.status = status
+        self.progress = progress
+        self.message = message
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "game_id": self.game_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class BuildQueue:
+    def __init__(self, workers: int, timeout: float, max_disk_bytes: int, retention: float):
+        self.timeout = timeout
+        self.max_disk_bytes = max_disk_bytes
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="build")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._stopping = threading.Event()
+
+    def submit(self, upload_dir: str, archive, game_fields: dict) -> BuildJob:
+        job = BuildJob(uuid.uuid4().hex, upload_dir, archive, game_fields)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, timeout: float = BUILD_SHUTDOWN_TIMEOUT):
+        """取消排队中的任务并清理其目录，终止正在运行的构建进程组，最多等待 timeout 秒"""
+        self._stopping.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            jobs = list(self._jobs.values())
+
+        running = []
+        for job in jobs:
+            if job.future is None or job.future.done():
+                if job.future is not None and job.future.cancelled():
+                    self._fail(job, "服务关闭，任务已取消")
+                continue
+            running.append(job.future)
+            if job.process:
+                self._kill(job.process)
+
+        if running:
+            _, not_done = wait(running, timeout=timeout)
+            if not_done:
+                print(f"⚠️ 关闭时仍有 {len(not_done)} 个构建任务未结束")
+
+    def _fail(self, job: BuildJob, error: str):
+        job.archive.close()
+        shutil.rmtree(job.upload_dir, ignore_errors=True)
+        job.error = error
+        job.update("failed", job.progress, error)
+        job.finished_at = time.time()
+
+    def _prune(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at and now - job.finished_at > self.retention]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _run(self, job: BuildJob):
+        job.started_at = time.time()
+        deadline = job.started_at + self.timeout
+        try:
+            self._extract(job)
+            if needs_build(job.upload_dir):
+                self._build(job, deadline)
+            self._validate(job)
+            job.game_id = self._insert_game(job)
+            job.update("done", 100, "构建完成")
+        except BuildError as e:
+            self._fail(job, str(e))
+        except Exception as e:
+            self._fail(job, f"内部错误: {e}")
+        finally:
+            job.process = None
+            job.finished_at = time.time()
+
+    def _extract(self, job: BuildJob):
+        job.update("extracting", 10, "正在解压 ZIP 文件")
+        try:
+            os.makedirs(job.upload_dir, exist_ok=True)
+            safe_extract_zip(job.archive, job.upload_dir)
+        except ZipLimitError as e:
+            raise BuildError(str(e))
+        except Exception as e:
+            raise BuildError(f"解压ZIP文件失败: {str(e)}")
+        finally:
+            job.archive.close()
+        if directory_size(job.upload_dir) > self.max_disk_bytes:
+            raise BuildError("解压后的文件超出磁盘空间限制")
+
+    def _build(self, job: BuildJob, deadline: float):
+        try:
+            cache_key = npm_cache.cache_key(job.upload_dir)
+        except (OSError, ValueError):
+            cache_key = None
+        restored = npm_cache.restore(cache_key, job.upload_dir)
+        if restored:
+            job.update("building", 30, "正在构建项目（已复用依赖缓存）")
+        else:
+            job.update("building", 30, "正在安装依赖并构建项目")
+        build_started = time.time()
+        process = subprocess.Popen(
+            [sys.executable, "-c", BUILD_RUNNER, job.upload_dir],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            start_new_session=True,
+        )
+        job.process = process
+        # 与 shutdown 竞争：关闭已开始但进程刚启动时也要终止
+        if self._stopping.is_set():
+            self._kill(process)
+        output = []
+        reader = threading.Thread(target=lambda: output.extend(process.stdout), daemon=True)
+        reader.start()
+
+        next_disk_check = time.time() + DISK_CHECK_INTERVAL
+        while process.poll() is None:
+            time.sleep(0.5)
+            now = time.time()
+            if now > deadline:
+                self._kill(process)
+                raise BuildError(f"项目构建超时（超过 {int(self.timeout)} 秒）")
+            if now >= next_disk_check:
+                next_disk_check = now + DISK_CHECK_INTERVAL
+                if directory_size(job.upload_dir) > self.max_disk_bytes:
+                    self._kill(process)
+                    raise BuildError("项目构建占用的磁盘空间超出限制")
+                # 构建阶段的进度按已用时间粗略估算
+                elapsed = (now - job.started_at) / self.timeout
+                job.progress = min(80, 30 + int(50 * elapsed))
+        reader.join(timeout=5)
+        if self._stopping.is_set():
+            raise BuildError("服务关闭，构建已中止")
+
+        result = None
+        for line in reversed(output):
+            try:
+                result = json.loads(line)
+                break
+            except ValueError:
+                continue
+        if not result:
+            raise BuildError(f"项目构建失败: {''.join(output[-20:]).strip()}")
+        if not result["success"]:
+            raise BuildError(f"项目构建失败: {result['error']}")
+
+        # 未命中时把安装好的 node_modules 移入依赖缓存，命中时记录节省的时间
+        build_seconds = time.time() - build_started
+        if restored:
+            npm_cache.record_hit_build(cache_key, build_seconds)
+        else:
+            try:
+                npm_cache.store(cache_key, job.upload_dir, build_seconds)
+            except OSError as e:
+                print(f"⚠️ 写入依赖缓存失败: {e}")
+
+        # 查找并使用构建输出目录
+        build_dir = find_build_output_dir(job.upload_dir)
+        if not build_dir:
+            raise BuildError("构建成功但未找到输出目录（dist/build/out）。请确保项目的构建脚本会生成这些目录之一。")
+
+        # 将构建输出移到根目录并清理源文件
+        build_path = os.path.join(job.upload_dir, build_dir)
+        temp_dir = job.upload_dir + "_temp"
+        shutil.move(build_path, temp_dir)
+        shutil.rmtree(job.upload_dir)
+        shutil.move(temp_dir, job.upload_dir)
+
+    def _kill(self, process: subprocess.Popen):
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except OSError:
+            pass
+        process.wait()
+
+    def _validate(self, job: BuildJob):
+        # 验证 index.html 存在（构建后或解压后）
+        job.update("validating", 90, "正在校验构建结果")
+        if not os.path.exists(os.path.join(job.upload_dir, "index.html")):
+            raise BuildError("未找到 index.html 文件。请确保 ZIP 包含 index.html（或构建后生成 index.html）。")
+
+    def _insert_game(self, job: BuildJob) -> int:
+        db = SessionLocal()
+        try:
+            new_game = Game(**job.game_fields)
+            db.add(new_game)
+            db.commit()
+            db.refresh(new_game)
+            # 多文件游戏在上传时就生成注入 base 标签后的页面，首次访问不再读盘
+            content_cache.put(new_game.id, load_game_html(db, new_game))
+            response_cache.invalidate_tags(category_tag(new_game.category_id))
+            return new_game.id
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"jobs": counts}
+
+build_queue = BuildQueue(BUILD_WORKERS, BUILD_TIMEOUT, BUILD_MAX_DISK_BYTES, BUILD_JOB_RETENTION)
@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# --- /content 游戏代码缓存 ---
+# 以游戏ID为键缓存编码后的 HTML，按总字节数做 LRU 淘汰。
+# 编辑、删除和文件同步时需要显式失效；显式失效只作用于当前进程，
+# 多 worker 部署时其它进程的条目靠 CONTENT_CACHE_TTL 过期兜底。
+CONTENT_CACHE_MAX_BYTES = int(os.environ.get("FUNAI_CONTENT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CONTENT_CACHE_TTL = float(os.environ.get("FUNAI_CONTENT_CACHE_TTL", "60"))
+# 启动时按浏览量预热的游戏数量，0 表示不预热
+CONTENT_CACHE_WARM_TOP_N = int(os.environ.get("FUNAI_CONTENT_CACHE_WARM_TOP_N", "20"))
+
+class ContentCache:
+    """按总字节数限制容量、条目带过期时间的 LRU 缓存"""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # 每个游戏的失效次数（clear 使用 None）；加载期间被失效时 put 不写入，避免把旧内容放回缓存
+        self._generations = {}
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+        self.stale_puts = 0
+
+    def get(self, game_id: int):
+        with self._lock:
+            entry = self._entries.get(game_id)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[game_id]
+                    self._bytes -= len(entry[1])
+                    self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(game_id)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, game_id: int) -> tuple:
+        """在查库/读盘之前取得，之后传给 put"""
+        with self._lock:
+            return self._generations.get(None, 0), self._generations.get(game_id, 0)
+
+    def put(self, game_id: int, html: str, generation: tuple = None) -> bytes:
+        """写入缓存并返回编码后的内容；超过总预算的单个内容不缓存，
+        传入的 generation 与当前不一致（加载期间被失效）时也不缓存"""
+        body = html.encode("utf-8")
+        if len(body) > self.max_bytes:
+            return body
+
+        with self._lock:
+            if generation is not None and generation != (self._generations.get(None, 0), self._generations.get(game_id, 0)):
+                self.stale_puts += 1
+                return body
+            old = self._entries.pop(game_id, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[game_id] = (time.monotonic() + self.ttl, body)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+        return body
+
+    def invalidate(self, *game_ids: int):
+        with self._lock:
+            for game_id in game_ids:
+                self._generations[game_id] = self._generations.get(game_id, 0) + 1
+                entry = self._entries.pop(game_id, None)
+                if entry is not None:
+                    self._bytes -= len(entry[1])
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generations[None] = self._generations.get(None, 0) + 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "bytes": self._bytes,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "expirations": self.expirations,
+                "stale_puts": self.stale_puts,
+            }
+
+content_cache = ContentCache(CONTENT_CACHE_MAX_BYTES, CONTENT_CACHE_TTL)
@@ -1,11 +1,59 @@
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float
-from sqlalchemy.orm import sessionmaker, Session, declarative_base
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, Date, DateTime, Float, Index, UniqueConstraint, LargeBinary, text
+from sqlalchemy.orm import sessionmaker, Session, declarative_base, load_only
 
 # --- 1. 数据库配置 ---
-SQLALCHEMY_DATABASE_URL = "sqlite:///./games.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+SQLALCHEMY_DATABASE_URL = os.environ.get("FUNAI_DATABASE_URL", "sqlite:///./games.db")
+
+# SQLite 引擎配置档，FUNAI_DB_PROFILE 选择，单项可用 FUNAI_SQLITE_<PRAGMA> 覆盖
+# production: WAL 模式，读不再被写阻塞；synchronous=NORMAL 在 WAL 下仍保证一致性
+# compat: 与旧版默认行为一致的回滚日志模式
+SQLITE_PROFILES = {
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": "-65536",       # 负数单位为 KiB，即 64 MiB
+        "mmap_size": "268435456",     # 256 MiB
+        "temp_store": "MEMORY",
+        "busy_timeout": "5000",       # 毫秒
+    },
+    "compat": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": "-2000",
+        "mmap_size": "0",
+        "temp_store": "DEFAULT",
+        "busy_timeout": "5000",
+    },
+}
+DB_PROFILE = os.environ.get("FUNAI_DB_PROFILE", "production")
+SQLITE_PRAGMAS = {
+    name: os.environ.get(f"FUNAI_SQLITE_{name.upper()}", value)
+    for name, value in SQLITE_PROFILES[DB_PROFILE].items()
+}
+
+# 连接池大小，需覆盖线程池中同时访问数据库的请求数（见 main.THREADPOOL_SIZE）
+DB_POOL_SIZE = int(os.environ.get("FUNAI_DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("FUNAI_DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = float(os.environ.get("FUNAI_DB_POOL_TIMEOUT", "30"))
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
+
+@event.listens_for(engine, "connect")
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """每个新连接都设置一遍 PRAGMA（除 journal_mode 外都是连接级别的）"""
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -23,7 +71,9 @@ class Game(Base):
     title = Column(String)
     description = Column(String)
     filename = Column(String, unique=True)
-    html_code = Column(Text)
+    html_code = Column(Text)                     # 旧数据的游戏代码，迁移到 game_blobs 后为空
+    content_hash = Column(String, index=True)    # 单文件游戏代码在 game_blobs 中的 sha256
+    content_size = Column(Integer, default=0)    # 游戏代码未压缩的字节数
     
     # 新增字段
     author = Column(String, default="匿名玩家")
@@ -42,6 +92,74 @@ class Game(Base):
     views = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # 与首页 filter(category_id).order_by(views desc) 查询匹配的复合索引
+        Index("ix_games_category_views", "category_id", "views"),
+        # /repo 按目录名确认多文件游戏已提交
+        Index("ix_games_directory_name", "directory_name"),
+    )
+
+# 评分记录模型：(game_id, client_id) 唯一，重复评分由索引直接拒绝
+class RatingEvent(Base):
+    __tablename__ = "rating_events"
+    id = Column(Integer, primary_key=True, index=True)
+    game_id = Column(Integer, nullable=False)
+    client_id = Column(String, nullable=False)   # 客户端标识（IP地址）
+    rating = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("game_id", "client_id", name="uq_rating_events_game_client"),
+    )
+
+# 排行榜按天汇总：每个游戏每天一行，浏览量写回和评分时增量累加，
+# 日/周/月排行榜只需对最近几十天的小表做聚合
+class GameDailyStat(Base):
+    __tablename__ = "game_daily_stats"
+    game_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True, index=True)   # UTC 日期
+    views = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Integer, default=0, nullable=False)
+    rating_count = Column(Integer, default=0, nullable=False)
+
+# games_repo 同步清单：记录每个文件上次同步时的 size / mtime / 内容哈希，
+# 未变化的文件只需一次 stat 即可跳过
+class SyncManifest(Base):
+    __tablename__ = "sync_manifest"
+    filename = Column(String, primary_key=True)
+    size = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    content_hash = Column(String, nullable=False)  # sha256
+    synced_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# 单文件游戏代码的内容寻址存储：sha256 -> zlib 压缩后的 HTML，内容相同的游戏共用一行
+class GameBlob(Base):
+    __tablename__ = "game_blobs"
+    hash = Column(String, primary_key=True)            # 未压缩内容（UTF-8）的 sha256
+    size = Column(Integer, nullable=False)             # 未压缩字节数
+    compressed_size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# 列表页（首页、/api/games、排行榜、仪表盘）只需要卡片字段，
+# 不加载 html_code / prompt 这类大字段
+GAME_LISTING_COLUMNS = (
+    Game.id,
+    Game.title,
+    Game.description,
+    Game.author,
+    Game.ai_model,
+    Game.category_id,
+    Game.rating,
+    Game.rating_count,
+    Game.views,
+    Game.created_at,
+)
+
+def query_game_listing(db: Session):
+    """返回只加载列表字段的 Game 查询"""
+    return db.query(Game).options(load_only(*GAME_LISTING_COLUMNS))
+
 # AI分类模型
 class AICategory(Base):
     __tablename__ = "ai_categories"
@@ -76,12 +194,144 @@ class AboutConfig(Base):
 class Like(Base):
     __tablename__ = "likes"
     id = Column(Integer, primary_key=True, index=True)
-    ip_address = Column(String, index=True)  # 用户IP地址，用于防刷
+    ip_address = Column(String)  # 用户IP地址，用于防刷
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # 唯一索引让重复点赞直接在 INSERT 时被拒绝
+        Index("uq_likes_ip_address", "ip_address", unique=True),
+    )
+
+# 计数器表：由触发器在同一事务内维护，读取计数只需一次主键查询
+class Counter(Base):
+    __tablename__ = "counters"
+    name = Column(String, primary_key=True)
+    value = Column(Integer, default=0, nullable=False)
+
+def read_counter(db: Session, name: str) -> int:
+    value = db.query(Counter.value).filter(Counter.name == name).scalar()
+    return value or 0
+
+# 各分类的游戏数量，计数器名为 games:category:<分类ID>
+CATEGORY_COUNTER_PREFIX = "games:category:"
+
+def category_counter_name(category_id: int) -> str:
+    return f"{CATEGORY_COUNTER_PREFIX}{category_id}"
+
+def read_category_counts(db: Session) -> dict:
+    rows = db.query(Counter.name, Counter.value).filter(Counter.name.startswith(CATEGORY_COUNTER_PREFIX)).all()
+    return {int(name[len(CATEGORY_COUNTER_PREFIX):]): value for name, value in rows}
+
 # 确保数据库表在模块导入时被创建
 Base.metadata.create_all(bind=engine)
 
+# create_all 不会为已存在的表补列，缺少时用 ALTER TABLE 添加：(表, 列, 列定义)
+COLUMN_UPGRADES = [
+    ("games", "content_hash", "VARCHAR"),
+    ("games", "content_size", "INTEGER DEFAULT 0"),
+]
+
+# create_all 不会为已存在的表补建新增的索引，这里用幂等的 DDL 补齐
+SCHEMA_UPGRADES = [
+    "CREATE INDEX IF NOT EXISTS ix_games_content_hash ON games (content_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_games_directory_name ON games (directory_name)",
+    "CREATE INDEX IF NOT EXISTS ix_games_category_views ON games (category_id, views)",
+    # 点赞计数由触发器增减，初始值见 DATA_MIGRATIONS 2
+    """CREATE TRIGGER IF NOT EXISTS trg_likes_count_insert AFTER INSERT ON likes BEGIN
+           UPDATE counters SET value = value + 1 WHERE name = 'likes';
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_likes_count_delete AFTER DELETE ON likes BEGIN
+           UPDATE counters SET value = value - 1 WHERE name = 'likes';
+       END""",
+    # 游戏全文检索：外部内容 FTS5 表（不重复存储文本），trigram 分词可直接匹配中文子串
+    """CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5(
+           title, description, author, ai_model, prompt,
+           content='games', content_rowid='id', tokenize='trigram'
+       )""",
+    # 由触发器与 games 保持同步；只有被索引的列变化时才更新（浏览量、评分写回不触发）
+    """CREATE TRIGGER IF NOT EXISTS trg_games_fts_insert AFTER INSERT ON games BEGIN
+           INSERT INTO games_fts (rowid, title, description, author, ai_model, prompt)
+           VALUES (new.id, new.title, new.description, new.author, new.ai_model, new.prompt);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_games_fts_delete AFTER DELETE ON games BEGIN
+           INSERT INTO games_fts (games_fts, rowid, title, description, author, ai_model, prompt)
+           VALUES ('delete', old.id, old.title, old.description, old.author, old.ai_model, old.prompt);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_games_fts_update AFTER UPDATE OF title, description, author, ai_model, prompt ON games BEGIN
+           INSERT INTO games_fts (games_fts, rowid, title, description, author, ai_model, prompt)
+           VALUES ('delete', old.id, old.title, old.description, old.author, old.ai_model, old.prompt);
+           INSERT INTO games_fts (rowid, title, description, author, ai_model, prompt)
+           VALUES (new.id, new.title, new.description, new.author, new.ai_model, new.prompt);
+       END""",
+    # 分类游戏数量由触发器在同一事务内增减，初始值见 DATA_MIGRATIONS 4
+    """CREATE TRIGGER IF NOT EXISTS trg_games_category_count_insert AFTER INSERT ON games
+       WHEN new.category_id IS NOT NULL BEGIN
+           INSERT INTO counters (name, value) VALUES ('games:category:' || new.category_id, 1)
+           ON CONFLICT (name) DO UPDATE SET value = value + 1;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_games_category_count_delete AFTER DELETE ON games
+       WHEN old.category_id IS NOT NULL BEGIN
+           UPDATE counters SET value = value - 1 WHERE name = 'games:category:' || old.category_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_games_category_count_update AFTER UPDATE OF category_id ON games
+       WHEN old.category_id IS NOT new.category_id BEGIN
+           UPDATE counters SET value = value - 1 WHERE name = 'games:category:' || old.category_id;
+           INSERT INTO counters (name, value) SELECT 'games:category:' || new.category_id, 1
+           WHERE new.category_id IS NOT NULL
+           ON CONFLICT (name) DO UPDATE SET value = value + 1;
+       END""",
+]
+
+# 一次性的数据迁移：需要扫描全表的回填、去重只在升级时执行一次，不在每次启动时重复。
+# 已执行到的序号记录在 PRAGMA user_version 中，和迁移语句在同一个事务里提交；只能在末尾追加
+DATA_MIGRATIONS = [
+    # 1: 首次创建按天汇总表时，用最近 31 天的评分记录回填（已有的日期行不覆盖）
+    [
+        """INSERT INTO game_daily_stats (game_id, day, views, rating_sum, rating_count)
+           SELECT game_id, date(created_at), 0, SUM(rating), COUNT(*) FROM rating_events
+           WHERE created_at >= date('now', '-31 days')
+           GROUP BY game_id, date(created_at)
+           ON CONFLICT (game_id, day) DO NOTHING""",
+    ],
+    # 2: 点赞按 IP 唯一：先清理历史重复记录，再把普通索引换成唯一索引，并按现有记录初始化点赞计数
+    [
+        "DELETE FROM likes WHERE id NOT IN (SELECT MIN(id) FROM likes GROUP BY ip_address)",
+        "DROP INDEX IF EXISTS ix_likes_ip_address",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_likes_ip_address ON likes (ip_address)",
+        "INSERT INTO counters (name, value) SELECT 'likes', COUNT(*) FROM likes WHERE true ON CONFLICT (name) DO NOTHING",
+    ],
+    # 3: 首次创建全文索引时从 games 重建，之后由触发器保持同步
+    [
+        "INSERT INTO games_fts (games_fts) VALUES ('rebuild')",
+    ],
+    # 4: 分类游戏数量按现有游戏初始化
+    [
+        """INSERT INTO counters (name, value)
+           SELECT 'games:category:' || category_id, COUNT(*) FROM games
+           WHERE category_id IS NOT NULL GROUP BY category_id
+           ON CONFLICT (name) DO NOTHING""",
+    ],
+]
+
+def upgrade_schema():
+    with engine.begin() as conn:
+        for table_name, column_name, definition in COLUMN_UPGRADES:
+            columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table_name})"))}
+            if column_name not in columns:
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition}"))
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
+        version = conn.execute(text("PRAGMA user_version")).scalar()
+        for number, statements in enumerate(DATA_MIGRATIONS, start=1):
+            if number <= version:
+                continue
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(text(f"PRAGMA user_version = {number}"))
+            print(f"🛠️ 已执行数据迁移 {number}")
+
+upgrade_schema()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -0,0 +1,125 @@
+import os
+import time
+import asyncio
+
+from utils import sync_games_from_folder
+
+# watchfiles 是可选依赖（Linux 上基于 inotify），未安装时退回到轮询
+try:
+    from watchfiles import awatch
+except ImportError:
+    awatch = None
+
+# --- games_repo 目录监听 ---
+# auto: 有 watchfiles 时用 inotify，否则轮询；inotify / poll: 强制指定；off: 关闭
+GAMES_WATCHER_MODE = os.environ.get("FUNAI_GAMES_WATCHER", "auto").lower()
+# 最后一次变更后等待多久再同步，合并同一次拷贝/保存产生的多个事件
+GAMES_WATCHER_DEBOUNCE = float(os.environ.get("FUNAI_GAMES_WATCHER_DEBOUNCE", "1.0"))
+# 轮询模式下的扫描间隔
+GAMES_WATCHER_POLL_INTERVAL = float(os.environ.get("FUNAI_GAMES_WATCHER_POLL_INTERVAL", "2.0"))
+
+class GamesWatcher:
+    """监听 games_repo 中 .html 文件的变化，只同步被改动的文件"""
+
+    def __init__(self, folder: str, mode: str, debounce: float, poll_interval: float):
+        self.folder = folder
+        self.mode = mode
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._stop_event = asyncio.Event()
+
+        # 统计信息
+        self.events = 0
+        self.syncs = 0
+        self.last_sync_at = None
+        self.last_summary = None
+        self.last_error = None
+
+    def resolve_mode(self) -> str:
+        if self.mode == "auto":
+            return "inotify" if awatch is not None else "poll"
+        if self.mode == "inotify" and awatch is None:
+            print("⚠️ 未安装 watchfiles，目录监听退回到轮询模式")
+            return "poll"
+        return self.mode
+
+    def stop(self):
+        """通知监听循环退出；inotify 模式下不能直接 cancel，否则监听线程会残留到进程退出"""
+        self._stop_event.set()
+
+    async def run(self):
+        """后台监听循环，由 main.py 的 lifespan 启动，调用 stop() 后结束"""
+        self.mode = self.resolve_mode()
+        if self.mode == "off":
+            return
+        self._stop_event.clear()
+        os.makedirs(self.folder, exist_ok=True)
+        print(f"👀 正在监听 {self.folder}（{self.mode}）")
+        if self.mode == "inotify":
+            await self._run_inotify()
+        else:
+            await self._run_poll()
+
+    async def _run_inotify(self):
+        debounce_ms = int(self.debounce * 1000)
+        async for changes in awatch(self.folder, debounce=debounce_ms, step=min(debounce_ms, 200),
+                                    recursive=False, stop_event=self._stop_event):
+            touched = {os.path.basename(path) for _, path in changes if path.endswith(".html")}
+            if touched:
+                await self._sync(touched)
+
+    async def _run_poll(self):
+        snapshot = self._scan()
+        touched = set()
+        last_change_at = 0.0
+        while not self._stop_event.is_set():
+            delay = self.poll_interval if not touched else min(self.poll_interval, self.debounce)
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+                break
+            except asyncio.TimeoutError:
+                pass
+            current = self._scan()
+            changed = {name for name in current.keys() | snapshot.keys() if current.get(name) != snapshot.get(name)}
+            snapshot = current
+            if changed:
+                touched |= changed
+                last_change_at = time.monotonic()
+            elif touched and time.monotonic() - last_change_at >= self.debounce:
+                batch, touched = touched, set()
+                await self._sync(batch)
+
+    def _scan(self) -> dict:
+        result = {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".html") and entry.is_file():
+                        stat = entry.stat()
+                        result[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        return result
+
+    async def _sync(self, filenames: set):
+        self.events += len(filenames)
+        try:
+            self.last_summary = await asyncio.to_thread(sync_games_from_folder, sorted(filenames))
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ 目录监听同步失败: {e}")
+        self.syncs += 1
+        self.last_sync_at = time.time()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "events": self.events,
+            "syncs": self.syncs,
+            "last_sync_at": self.last_sync_at,
+            "last_summary": self.last_summary,
+            "last_error": self.last_error,
+        }
+
+games_watcher = GamesWatcher("games_repo", GAMES_WATCHER_MODE, GAMES_WATCHER_DEBOUNCE, GAMES_WATCHER_POLL_INTERVAL)
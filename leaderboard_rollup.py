@@ -0,0 +1,171 @@
+import os
+import time
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import SessionLocal, engine, Game, GameDailyStat, query_game_listing
+from response_cache import response_cache, LEADERBOARD_TAG
+
+# --- 日/周/月排行榜 ---
+# 浏览量写回和评分时把增量累加到 game_daily_stats（每游戏每天一行），
+# 后台任务按间隔从这张小表聚合出各周期的 Top N 快照，请求直接读取内存中的快照。
+LEADERBOARD_REFRESH_INTERVAL = float(os.environ.get("FUNAI_LEADERBOARD_REFRESH_INTERVAL", "60"))
+LEADERBOARD_TOP_N = int(os.environ.get("FUNAI_LEADERBOARD_TOP_N", "10"))
+# 按天汇总数据的保留天数，需覆盖最长的统计周期（月榜）
+LEADERBOARD_RETENTION_DAYS = int(os.environ.get("FUNAI_LEADERBOARD_RETENTION_DAYS", "90"))
+
+PERIODS = {
+    "daily": "今日",
+    "weekly": "本周",
+    "monthly": "本月",
+}
+
+daily_stats_table = GameDailyStat.__table__
+_daily_upsert = sqlite_insert(daily_stats_table)
+_daily_upsert = _daily_upsert.on_conflict_do_update(
+    index_elements=[daily_stats_table.c.game_id, daily_stats_table.c.day],
+    set_={
+        "views": daily_stats_table.c.views + _daily_upsert.excluded.views,
+        "rating_sum": daily_stats_table.c.rating_sum + _daily_upsert.excluded.rating_sum,
+        "rating_count": daily_stats_table.c.rating_count + _daily_upsert.excluded.rating_count,
+    },
+)
+
+def record_daily_stats(conn, rows: list):
+    """在调用方的事务中累加按天汇总数据，rows 为 {game_id, views, rating_sum, rating_count} 列表"""
+    if not rows:
+        return
+    today = datetime.utcnow().date()
+    conn.execute(_daily_upsert, [
+        {
+            "game_id": row["game_id"],
+            "day": today,
+            "views": row.get("views", 0),
+            "rating_sum": row.get("rating_sum", 0),
+            "rating_count": row.get("rating_count", 0),
+        }
+        for row in rows
+    ])
+
+def period_start(period: str, today=None):
+    today = today or datetime.utcnow().date()
+    if period == "daily":
+        return today
+    if period == "weekly":
+        return today - timedelta(days=today.weekday())
+    return today.replace(day=1)
+
+class LeaderboardRollup:
+    def __init__(self, refresh_interval: float, top_n: int, retention_days: int):
+        self.refresh_interval = refresh_interval
+        self.top_n = top_n
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._snapshots = {}
+
+        # 统计信息
+        self.refresh_count = 0
+        self.last_refresh_ms = 0.0
+        self.last_refresh_at = None
+        self.last_error = None
+
+    def _compute(self, db, period: str, today) -> list:
+        totals = (
+            select(
+                GameDailyStat.game_id,
+                func.sum(GameDailyStat.views).label("views"),
+                func.sum(GameDailyStat.rating_sum).label("rating_sum"),
+                func.sum(GameDailyStat.rating_count).label("rating_count"),
+            )
+            .where(GameDailyStat.day >= period_start(period, today))
+            .group_by(GameDailyStat.game_id)
+            .subquery()
+        )
+        period_rating = totals.c.rating_sum * 1.0 / func.nullif(totals.c.rating_count, 0)
+        # 与原排行榜一致：先按（周期内）评分，再按浏览量排序
+        rows = (
+            query_game_listing(db)
+            .join(totals, totals.c.game_id == Game.id)
+            .add_columns(totals.c.views, period_rating.label("period_rating"), totals.c.rating_count)
+            .order_by(period_rating.desc().nulls_last(), totals.c.views.desc(), Game.id)
+            .limit(self.top_n)
+            .all()
+        )
+        return [
+            {
+                "id": game.id,
+                "title": game.title,
+                "description": game.description,
+                "author": game.author,
+                "ai_model": game.ai_model,
+                "rating": round(rating, 1) if rating is not None else 0,
+                "rating_count": rating_count,
+                "views": views,
+            }
+            for game, views, rating, rating_count in rows
+        ]
+
+    def refresh(self):
+        """重新计算所有周期的快照"""
+        started = time.perf_counter()
+        today = datetime.utcnow().date()
+        db = SessionLocal()
+        try:
+            snapshots = {period: self._compute(db, period, today) for period in PERIODS}
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ 排行榜刷新失败: {e}")
+            return
+        finally:
+            db.close()
+
+        with self._lock:
+            self._snapshots = {"day": today, "periods": snapshots}
+        response_cache.invalidate_tags(LEADERBOARD_TAG)
+        self.refresh_count += 1
+        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.last_refresh_at = time.time()
+        self.last_error = None
+
+    def prune(self):
+        cutoff = datetime.utcnow().date() - timedelta(days=self.retention_days)
+        try:
+            with engine.begin() as conn:
+                conn.execute(delete(daily_stats_table).where(daily_stats_table.c.day < cutoff))
+        except Exception as e:
+            print(f"⚠️ 清理排行榜汇总数据失败: {e}")
+
+    def get(self, period: str) -> list:
+        """读取周期快照；尚未生成或已跨天时同步刷新一次"""
+        with self._lock:
+            snapshots = self._snapshots
+        if not snapshots or snapshots["day"] != datetime.utcnow().date():
+            self.refresh()
+            with self._lock:
+                snapshots = self._snapshots
+        return snapshots.get("periods", {}).get(period, [])
+
+    def stats(self) -> dict:
+        return {
+            "refresh_interval": self.refresh_interval,
+            "refresh_count": self.refresh_count,
+            "last_refresh_ms": self.last_refresh_ms,
+            "last_refresh_at": self.last_refresh_at,
+            "last_error": self.last_error,
+        }
+
+    async def run(self):
+        """后台刷新循环，由 main.py 的 lifespan 启动"""
+        pruned_day = None
+        while True:
+            today = datetime.utcnow().date()
+            if pruned_day != today:
+                await asyncio.to_thread(self.prune)
+                pruned_day = today
+            await asyncio.to_thread(self.refresh)
+            await asyncio.sleep(self.refresh_interval)
+
+leaderboard_rollup = LeaderboardRollup(LEADERBOARD_REFRESH_INTERVAL, LEADERBOARD_TOP_N, LEADERBOARD_RETENTION_DAYS)
@@ -1,21 +1,68 @@
 import uvicorn
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+import asyncio
 import os
+import anyio
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
 # 导入工具函数和路由
-from utils import sync_games_from_folder
+from startup_sync import startup_sync, STARTUP_SYNC_MODE
+from view_counter import view_counter
+from games_watcher import games_watcher
+from url_checker import url_checker
+from build_queue import build_queue
+from leaderboard_rollup import leaderboard_rollup
+from response_cache import response_cache
+from templating import precompile_templates, TEMPLATE_PRECOMPILE
+from zip_ingest import UploadSizeLimitMiddleware
 # 导入路由
-from routers import games, leaderboard, admin, ai_navigation, about  # 添加admin、ai_navigation和about导入
+from routers import games, leaderboard, admin, ai_navigation, about, repo, health  # 添加admin、ai_navigation和about导入
+
+# 同步路由和 run_in_threadpool 共用的线程池大小，应与数据库连接池容量
+# （FUNAI_DB_POOL_SIZE + FUNAI_DB_MAX_OVERFLOW）保持一致
+THREADPOOL_SIZE = int(os.environ.get("FUNAI_THREADPOOL_SIZE", "40"))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 在应用启动时运行文件同步逻辑
-    sync_games_from_folder()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # 生产环境启动时预编译全部模板，模板语法错误直接阻止启动
+    if TEMPLATE_PRECOMPILE:
+        precompile_templates()
+    # 同步 games_repo 并按浏览量预热 /content 缓存；默认在后台执行，不阻塞启动，进度见 /ready
+    startup_task = None
+    if STARTUP_SYNC_MODE == "blocking":
+        startup_sync.run()
+    else:
+        startup_task = asyncio.create_task(asyncio.to_thread(startup_sync.run))
+    # AI 导航默认分类只需在启动时补齐一次
+    ai_navigation.seed_default_categories()
+    # 启动后台任务：浏览量批量写回、排行榜快照刷新、games_repo 目录监听
+    watcher_task = asyncio.create_task(games_watcher.run())
+    background_tasks = [
+        asyncio.create_task(view_counter.run()),
+        asyncio.create_task(leaderboard_rollup.run()),
+    ]
     yield
+    # 关闭时停止后台任务，并把缓冲中的浏览量写回数据库
+    games_watcher.stop()
+    await watcher_task
+    # 同步线程无法取消，等它提交完再关闭
+    if startup_task:
+        await startup_task
+    for task in background_tasks:
+        task.cancel()
+    for task in background_tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+    view_counter.flush()
+    await url_checker.close()
+    await asyncio.to_thread(build_queue.shutdown)
+    response_cache.shutdown()
 
 app = FastAPI(lifespan=lifespan)
+# 上传请求在解析表单之前按大小拒绝，避免超大请求体先被完整写入临时文件
+app.add_middleware(UploadSizeLimitMiddleware)
 
 # 配置静态文件服务
 # 确保uploads目录存在
@@ -31,6 +78,8 @@ app.include_router(leaderboard.router)
 app.include_router(admin.router)  # 添加admin路由
 app.include_router(ai_navigation.router)  # 添加ai_navigation路由
 app.include_router(about.router)  # 添加about路由
+app.include_router(repo.router)  # 多文件游戏静态资源
+app.include_router(health.router)  # 就绪检查
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
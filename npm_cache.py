@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+import subprocess
+
+from utils import directory_size
+
+# --- npm 依赖缓存 ---
+# 以 lockfile（没有时用规范化后的 package.json）加 Node 主版本的哈希为键，
+# 缓存构建用过的 node_modules，相同模板的项目再次构建时直接复制，不再重新安装。
+NPM_CACHE_DIR = os.environ.get("FUNAI_NPM_CACHE_DIR", os.path.join(".build_cache", "node_modules"))
+NPM_CACHE_MAX_BYTES = int(os.environ.get("FUNAI_NPM_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+NPM_CACHE_MAX_AGE_DAYS = float(os.environ.get("FUNAI_NPM_CACHE_MAX_AGE_DAYS", "14"))
+
+LOCKFILES = ["package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml"]
+# 参与缓存键计算的 package.json 字段，脚本、名称、版本号等不影响依赖
+DEPENDENCY_FIELDS = ["dependencies", "devDependencies", "peerDependencies",
+                     "optionalDependencies", "overrides", "resolutions"]
+META_FILE = "meta.json"
+
+def node_major_version() -> str:
+    try:
+        output = subprocess.run(["node", "--version"], capture_output=True, text=True, timeout=10).stdout
+        return output.strip().lstrip("v").split(".")[0] or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+class NpmDependencyCache:
+    def __init__(self, cache_dir: str, max_bytes: int, max_age_days: float):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._node_version = None
+        # 正在复制到项目目录的条目（键 -> 复制中的任务数），淘汰时跳过
+        self._in_use = {}
+
+        # 统计信息（进程内）
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.seconds_saved = 0.0
+
+    def cache_key(self, project_dir: str) -> str:
+        """计算项目的依赖缓存键，没有 package.json 时返回 None"""
+        package_json = os.path.join(project_dir, "package.json")
+        if not os.path.exists(package_json):
+            return None
+        if self._node_version is None:
+            self._node_version = node_major_version()
+
+        digest = hashlib.sha256(f"node{self._node_version}\n".encode())
+        for lockfile in LOCKFILES:
+            lock_path = os.path.join(project_dir, lockfile)
+            if os.path.exists(lock_path):
+                digest.update(lockfile.encode() + b"\n")
+                with open(lock_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(chunk)
+                return digest.hexdigest()
+
+        with open(package_json, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        dependencies = {field: manifest.get(field) for field in DEPENDENCY_FIELDS if manifest.get(field)}
+        digest.update(json.dumps(dependencies, sort_keys=True, separators=(",", ":")).encode())
+        return digest.hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _read_meta(self, key: str) -> dict:
+        try:
+            with open(os.path.join(self._entry_dir(key), META_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, key: str, meta: dict):
+        path = os.path.join(self._entry_dir(key), META_FILE)
+        tmp_path = f"{path}.{uuid.uuid4().hex}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def restore(self, key: str, project_dir: str) -> bool:
+        """命中时把缓存的 node_modules 复制到项目目录"""
+        if key is None:
+            return False
+        source = os.path.join(self._entry_dir(key), "node_modules")
+        target = os.path.join(project_dir, "node_modules")
+        with self._lock:
+            if not os.path.isdir(source) or os.path.exists(target):
+                self.misses += 1
+                return False
+            meta = self._read_meta(key)
+            meta["last_used"] = time.time()
+            meta["hits"] = meta.get("hits", 0) + 1
+            self._write_meta(key, meta)
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+        # 复制而不是硬链接：构建过程中可能原地改写 node_modules 里的文件；
+        # 复制在锁外进行，期间条目被标记为使用中，evict 不会删除它
+        try:
+            shutil.copytree(source, target, symlinks=True)
+        except OSError as e:
+            print(f"⚠️ 复用依赖缓存失败，改为重新安装: {e}")
+            shutil.rmtree(target, ignore_errors=True)
+            with self._lock:
+                self.misses += 1
+            return False
+        finally:
+            with self._lock:
+                self._in_use[key] -= 1
+                if not self._in_use[key]:
+                    del self._in_use[key]
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def record_hit_build(self, key: str, build_seconds: float):
+        """命中后的构建完成时，按该键首次完整构建的耗时累计节省的时间"""
+        meta = self._read_meta(key)
+        full_build = meta.get("build_seconds")
+        if full_build:
+            with self._lock:
+                self.seconds_saved += max(0.0, full_build - build_seconds)
+
+    def store(self, key: str, project_dir: str, build_seconds: float):
+        """构建成功后把项目的 node_modules 移入缓存（项目目录随后会被清理）"""
+        source = os.path.join(project_dir, "node_modules")
+        if key is None or not os.path.isdir(source):
+            return
+        entry_dir = self._entry_dir(key)
+        if os.path.isdir(os.path.join(entry_dir, "node_modules")):
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = os.path.join(self.cache_dir, f".staging-{uuid.uuid4().hex}")
+        os.makedirs(staging)
+        shutil.move(source, os.path.join(staging, "node_modules"))
+        now = time.time()
+        meta = {
+            "size": directory_size(staging),
+            "created": now,
+            "last_used": now,
+            "hits": 0,
+            "build_seconds": round(build_seconds, 2),
+        }
+        with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        with self._lock:
+            try:
+                os.rename(staging, entry_dir)
+                self.stores += 1
+            except OSError:
+                # 另一个构建已经写入了相同的键
+                shutil.rmtree(staging, ignore_errors=True)
+                return
+        self.evict()
+
+    def evict(self):
+        """删除超过最大保留时间的条目，再按最近使用时间淘汰到总大小以内；正在复制的条目不删除"""
+        with self._lock:
+            if not os.path.isdir(self.cache_dir):
+                return
+            entries = []
+            for key in os.listdir(self.cache_dir):
+                if key.startswith("."):
+                    continue
+                meta = self._read_meta(key)
+                entries.append((meta.get("last_used", 0), meta.get("size", 0), key))
+
+            now = time.time()
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            for last_used, size, key in entries:
+                if key in self._in_use or (now - last_used <= self.max_age and total <= self.max_bytes):
+                    continue
+                shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                total -= size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        entries = 0
+        total_bytes = 0
+        if os.path.isdir(self.cache_dir):
+            for key in os.listdir(self.cache_dir):
+                if not key.startswith("."):
+                    entries += 1
+                    total_bytes += self._read_meta(key).get("size", 0)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "seconds_saved": round(self.seconds_saved, 1),
+        }
+
+npm_cache = NpmDependencyCache(NPM_CACHE_DIR, NPM_CACHE_MAX_BYTES, NPM_CACHE_MAX_AGE_DAYS)
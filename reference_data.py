@@ -0,0 +1,96 @@
+import os
+from dataclasses import dataclass, asdict
+
+from database import SessionLocal, Category, AboutConfig
+from ttl_cache import TTLCache
+
+# --- 参考数据缓存 ---
+# 分类列表和关于页面配置只会通过管理接口修改：读取时返回不可变的快照，
+# 管理接口写入后显式失效；TTL 只作为兜底（例如 init_categories.py 等其它进程直接改库）。
+REFERENCE_DATA_TTL = float(os.environ.get("FUNAI_REFERENCE_DATA_TTL", "300"))
+
+DEFAULT_ABOUT_CONFIG = {
+    "purpose": "这是一个AI游戏实验室，旨在探索AI技术在游戏开发中的应用。",
+    "reward_enabled": 1,
+    "reward_image_url": "",
+    "reward_description": "感谢您的支持！",
+}
+
+@dataclass(frozen=True)
+class CategoryInfo:
+    id: int
+    name: str
+
+@dataclass(frozen=True)
+class AboutConfigInfo:
+    id: int
+    purpose: str
+    reward_enabled: int
+    reward_image_url: str
+    reward_description: str
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+class ReferenceDataCache:
+    CATEGORIES = "categories"
+    ABOUT_CONFIG = "about_config"
+
+    def __init__(self, ttl: float):
+        self._cache = TTLCache(ttl, maxsize=8)
+        # 每个键的失效次数；查询期间发生写入时不把旧结果写回缓存
+        self._versions = {}
+
+    def _load(self, key: str, loader):
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+        version = self._versions.get(key, 0)
+        db = SessionLocal()
+        try:
+            value = loader(db)
+        finally:
+            db.close()
+        if version == self._versions.get(key, 0):
+            self._cache.set(key, value)
+        return value
+
+    def invalidate(self, key: str):
+        self._versions[key] = self._versions.get(key, 0) + 1
+        self._cache.invalidate(key)
+
+    def categories(self) -> tuple:
+        """全部游戏分类（按 ID 排序）"""
+        def loader(db):
+            rows = db.query(Category.id, Category.name).order_by(Category.id).all()
+            return tuple(CategoryInfo(id=row.id, name=row.name) for row in rows)
+        return self._load(self.CATEGORIES, loader)
+
+    def about_config(self) -> AboutConfigInfo:
+        """关于页面配置，不存在时创建默认配置"""
+        def loader(db):
+            about_config = db.query(AboutConfig).first()
+            if not about_config:
+                about_config = AboutConfig(**DEFAULT_ABOUT_CONFIG)
+                db.add(about_config)
+                db.commit()
+                db.refresh(about_config)
+            return AboutConfigInfo(
+                id=about_config.id,
+                purpose=about_config.purpose,
+                reward_enabled=about_config.reward_enabled,
+                reward_image_url=about_config.reward_image_url,
+                reward_description=about_config.reward_description,
+            )
+        return self._load(self.ABOUT_CONFIG, loader)
+
+    def invalidate_categories(self):
+        self.invalidate(self.CATEGORIES)
+
+    def invalidate_about_config(self):
+        self.invalidate(self.ABOUT_CONFIG)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+reference_data = ReferenceDataCache(REFERENCE_DATA_TTL)
@@ -0,0 +1,163 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.responses import Response
+
+from database import SessionLocal
+
+# --- 页面响应缓存 ---
+# 首页、/api/games 和排行榜对所有访客的输出相同：按路由 + 规范化参数缓存渲染结果。
+# 写操作按标签（如某个分类）定点失效；过期后的 RESPONSE_CACHE_STALE 秒内先返回旧内容，
+# 由后台刷新一次（stale-while-revalidate）；未命中时同一个键只渲染一次，其它请求等待结果。
+RESPONSE_CACHE_TTL = float(os.environ.get("FUNAI_RESPONSE_CACHE_TTL", "10"))
+RESPONSE_CACHE_STALE = float(os.environ.get("FUNAI_RESPONSE_CACHE_STALE", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("FUNAI_RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+# 等待其它请求渲染同一页面的最长时间，超时后自行渲染
+SINGLE_FLIGHT_TIMEOUT = 10.0
+
+def category_tag(category_id: int) -> str:
+    return f"category:{category_id}"
+
+LEADERBOARD_TAG = "leaderboard"
+
+class CachedPage:
+    __slots__ = ("body", "media_type", "tags", "fresh_until", "stale_until")
+
+    def __init__(self, body: bytes, media_type: str, tags: tuple, ttl: float, stale: float):
+        now = time.monotonic()
+        self.body = body
+        self.media_type = media_type
+        self.tags = tags
+        self.fresh_until = now + ttl
+        self.stale_until = now + ttl + stale
+
+class ResponseCache:
+    def __init__(self, ttl: float, stale: float, max_entries: int):
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._refreshing = set()
+        # 每个标签的失效次数（clear 使用 None）；渲染期间相关标签被失效时不写入结果，避免缓存旧数据
+        self._generations = {}
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="response-cache")
+
+        # 统计信息
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.renders = 0
+        self.invalidations = 0
+
+    def get_or_render(self, key: tuple, tags: tuple, media_type: str, render) -> Response:
+        """返回缓存的页面；render(db) 负责渲染并返回响应体 bytes"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.fresh_until:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._response(entry, "HIT")
+            if entry is not None and now < entry.stale_until:
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._executor.submit(self._refresh, key, tags, media_type, render)
+                return self._response(entry, "STALE")
+
+            self.misses += 1
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[key] = threading.Event()
+
+        if not owner:
+            # 已有请求在渲染同一页面，等待它的结果
+            flight.wait(SINGLE_FLIGHT_TIMEOUT)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() < entry.stale_until:
+                    self.coalesced += 1
+                    return self._response(entry, "HIT")
+            return self._response(self._render(key, tags, media_type, render), "MISS")
+
+        try:
+            return self._response(self._render(key, tags, media_type, render), "MISS")
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.set()
+
+    def _render(self, key: tuple, tags: tuple, media_type: str, render) -> CachedPage:
+        generation = self._generation_of(tags)
+        db = SessionLocal()
+        try:
+            body = render(db)
+        finally:
+            db.close()
+        entry = CachedPage(body, media_type, tags, self.ttl, self.stale)
+        with self._lock:
+            self.renders += 1
+            if generation == self._generation_of(tags):
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def _refresh(self, key: tuple, tags: tuple, media_type: str, render):
+        try:
+            self._render(key, tags, media_type, render)
+        except Exception as e:
+            print(f"⚠️ 后台刷新页面缓存失败 {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _generation_of(self, tags: tuple) -> tuple:
+        return tuple(self._generations.get(tag, 0) for tag in (None, *tags))
+
+    def _response(self, entry: CachedPage, status: str) -> Response:
+        return Response(content=entry.body, media_type=entry.media_type, headers={"X-Cache": status})
+
+    def invalidate_tags(self, *tags):
+        """删除带有任一标签的页面"""
+        tags = set(tags)
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            keys = [key for key, entry in self._entries.items() if tags.intersection(entry.tags)]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._generations[None] = self._generations.get(None, 0) + 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "ttl": self.ttl,
+            "stale": self.stale,
+            "entries": entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "renders": self.renders,
+            "invalidations": self.invalidations,
+        }
+
+response_cache = ResponseCache(RESPONSE_CACHE_TTL, RESPONSE_CACHE_STALE, RESPONSE_CACHE_MAX_ENTRIES)
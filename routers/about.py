@@ -2,33 +2,25 @@ import os
 import uuid
 from fastapi import APIRouter, Request, Depends, HTTPException, File, UploadFile, Form
 from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from database import get_db, AboutConfig, Like
+from database import get_db, AboutConfig, Like, read_counter
+from reference_data import reference_data
+from templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 @router.get("/about", response_class=HTMLResponse)
-async def about_page(request: Request, db: Session = Depends(get_db)):
+def about_page(request: Request, db: Session = Depends(get_db)):
     """关于页面"""
-    # 获取关于页面配置
-    about_config = db.query(AboutConfig).first()
-    if not about_config:
-        # 如果没有配置，创建默认配置
-        about_config = AboutConfig(
-            purpose="这是一个AI游戏实验室，旨在探索AI技术在游戏开发中的应用。",
-            reward_enabled=1,
-            reward_image_url="",
-            reward_description="感谢您的支持！"
-        )
-        db.add(about_config)
-        db.commit()
-        db.refresh(about_config)
+    # 获取关于页面配置（缓存的快照，不存在时创建默认配置）
+    about_config = reference_data.about_config()
     
-    # 获取点赞数量
-    like_count = db.query(Like).count()
+    # 获取点赞数量（计数器表的主键查询，与点赞总数无关）
+    like_count = read_counter(db, "likes")
     
     return templates.TemplateResponse(
         "about.html",
@@ -40,42 +32,32 @@ async def about_page(request: Request, db: Session = Depends(get_db)):
     )
 
 @router.post("/api/about/like")
-async def like_about(request: Request, db: Session = Depends(get_db)):
+def like_about(request: Request, db: Session = Depends(get_db)):
     """点赞功能"""
     # 获取用户IP地址
     client_ip = request.client.host
     
-    # 检查用户是否已经点赞过
-    existing_like = db.query(Like).filter(Like.ip_address == client_ip).first()
-    if existing_like:
+    # 添加点赞记录，ip_address 唯一索引会直接拒绝重复点赞
+    try:
+        db.execute(insert(Like).values(ip_address=client_ip))
+    except IntegrityError:
+        db.rollback()
         return JSONResponse({"status": "error", "message": "您已经点赞过了"})
     
-    # 添加点赞记录
-    new_like = Like(ip_address=client_ip)
-    db.add(new_like)
+    # 触发器已在同一事务内更新计数，提交前读取最新点赞数量
+    like_count = read_counter(db, "likes")
     db.commit()
     
-    # 获取最新点赞数量
-    like_count = db.query(Like).count()
-    
     return JSONResponse({"status": "success", "like_count": like_count})
 
 @router.get("/api/about/config")
-async def get_about_config(db: Session = Depends(get_db)):
+def get_about_config():
     """获取关于页面配置"""
-    about_config = db.query(AboutConfig).first()
-    if not about_config:
-        return JSONResponse({"status": "error", "message": "配置不存在"})
+    about_config = reference_data.about_config()
     
     return JSONResponse({
         "status": "success",
-        "config": {
-            "id": about_config.id,
-            "purpose": about_config.purpose,
-            "reward_enabled": about_config.reward_enabled,
-            "reward_image_url": about_config.reward_image_url,
-            "reward_description": about_config.reward_description
-        }
+        "config": about_config.to_dict()
     })
 
 @router.post("/api/about/config")
@@ -116,15 +98,24 @@ async def update_about_config(
         # 保存文件
         try:
             content = await reward_image_upload.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
+            await run_in_threadpool(save_upload, file_path, content)
             
             # 生成文件URL
             reward_image_url = f"/uploads/{unique_filename}"
         except Exception as e:
             return JSONResponse({"status": "error", "message": f"文件上传失败：{str(e)}"})
     
-    # 获取或创建关于页面配置
+    config = await run_in_threadpool(
+        save_about_config, db, purpose, reward_enabled, reward_image_url, reward_description
+    )
+    return JSONResponse({"status": "success", "config": config})
+
+def save_upload(file_path: str, content: bytes):
+    with open(file_path, "wb") as f:
+        f.write(content)
+
+def save_about_config(db: Session, purpose, reward_enabled, reward_image_url, reward_description) -> dict:
+    """获取或创建关于页面配置并保存（在线程池中执行）"""
     about_config = db.query(AboutConfig).first()
     if not about_config:
         # 如果没有配置，创建新配置
@@ -148,14 +139,12 @@ async def update_about_config(
     
     db.commit()
     db.refresh(about_config)
+    reference_data.invalidate_about_config()
     
-    return JSONResponse({
-        "status": "success",
-        "config": {
-            "id": about_config.id,
-            "purpose": about_config.purpose,
-            "reward_enabled": about_config.reward_enabled,
-            "reward_image_url": about_config.reward_image_url,
-            "reward_description": about_config.reward_description
-        }
-    })
+    return {
+        "id": about_config.id,
+        "purpose": about_config.purpose,
+        "reward_enabled": about_config.reward_enabled,
+        "reward_image_url": about_config.reward_image_url,
+        "reward_description": about_config.reward_description
+    }
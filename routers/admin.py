@@ -1,16 +1,30 @@
 import os
+from urllib.parse import urlencode
 from fastapi import APIRouter, Request, Depends, Form, HTTPException, Response
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 import secrets
 
 # 从父级目录导入数据库和工具函数
-from database import get_db, Game, Category, AboutConfig
+from database import get_db, Game, Category, query_game_listing, read_category_counts
 from utils import sync_games_from_folder
+from view_counter import view_counter
+from content_cache import content_cache
+from blob_store import release_blobs
+from response_cache import response_cache, category_tag, LEADERBOARD_TAG
+from games_watcher import games_watcher
+from url_checker import url_checker
+from build_queue import build_queue
+from npm_cache import npm_cache
+from leaderboard_rollup import leaderboard_rollup
+from routers.ai_navigation import navigation_cache
+from routers.repo import committed_directories
+from reference_data import reference_data
+from startup_sync import startup_sync
+from templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 # 管理员密钥
 ADMIN_KEY = "admin123"
@@ -60,35 +74,89 @@ async def admin_login(
         )
 
 # --- 管理员仪表盘 ---
+# 游戏列表允许的排序字段，避免把任意参数拼进 ORDER BY
+ADMIN_SORT_COLUMNS = {
+    "id": Game.id,
+    "title": Game.title,
+    "views": Game.views,
+    "rating": Game.rating,
+    "created_at": Game.created_at,
+}
+ADMIN_PAGE_SIZES = [20, 50, 100, 200]
+
 @router.get("/admin/dashboard", response_class=HTMLResponse)
-async def admin_dashboard(
+def admin_dashboard(
     request: Request,
+    page: int = 1,
+    page_size: int = 50,
+    sort: str = "id",
+    order: str = "desc",
+    q: str = "",
+    category_id: int = 0,
     db: Session = Depends(get_db),
     _: bool = Depends(verify_admin_cookie)
 ):
-    """管理员仪表盘"""
-    games = db.query(Game).all()
-    categories = db.query(Category).all()
-    total_games = len(games)
-    # 处理空列表的情况，防止 sum 报错（虽然 sum 空列表是 0，但为了健壮性）
-    total_views = sum(game.views for game in games) if games else 0
-    total_ratings = sum(game.rating_count for game in games) if games else 0
-    
+    """管理员仪表盘：统计由 SQL 聚合得出，游戏列表在数据库中分页、排序和筛选"""
+    if page_size not in ADMIN_PAGE_SIZES:
+        page_size = 50
+    if sort not in ADMIN_SORT_COLUMNS:
+        sort = "id"
+    if order not in ("asc", "desc"):
+        order = "desc"
+    q = q.strip()
+
+    categories = reference_data.categories()
+    total_games, total_views, total_ratings = db.query(
+        func.count(Game.id),
+        func.coalesce(func.sum(Game.views), 0),
+        func.coalesce(func.sum(Game.rating_count), 0)
+    ).one()
+    # 各分类的游戏数量（触发器维护的计数器）
+    category_counts = read_category_counts(db)
+
+    games_query = query_game_listing(db)
+    if category_id:
+        games_query = games_query.filter(Game.category_id == category_id)
+    if q:
+        pattern = f"%{q}%"
+        games_query = games_query.filter(or_(Game.title.like(pattern), Game.author.like(pattern)))
+    filtered_total = games_query.order_by(None).count() if (q or category_id) else total_games
+
+    total_pages = max(1, (filtered_total + page_size - 1) // page_size)
+    page = min(max(page, 1), total_pages)
+    sort_column = ADMIN_SORT_COLUMNS[sort]
+    sort_column = sort_column.asc() if order == "asc" else sort_column.desc()
+    games = games_query.order_by(sort_column, Game.id.desc()).offset((page - 1) * page_size).limit(page_size).all()
+
+    filters = {"page_size": page_size, "sort": sort, "order": order, "q": q, "category_id": category_id}
+
+    def dashboard_url(**overrides) -> str:
+        """生成保留当前筛选条件的仪表盘链接"""
+        params = {**filters, "page": page, **overrides}
+        return "/admin/dashboard?" + urlencode({k: v for k, v in params.items() if v not in (None, "", 0)})
+
     return templates.TemplateResponse(
         "admin/admin_dashboard.html", 
         {
             "request": request, 
             "games": games, 
             "categories": categories,
+            "category_counts": category_counts,
             "total_games": total_games, 
             "total_views": total_views, 
-            "total_ratings": total_ratings
+            "total_ratings": total_ratings,
+            "filtered_total": filtered_total,
+            "page": page,
+            "total_pages": total_pages,
+            "page_sizes": ADMIN_PAGE_SIZES,
+            "filters": filters,
+            "dashboard_url": dashboard_url
         }
     )
 
 # --- 删除游戏功能 ---
 @router.post("/admin/delete/{game_id}")
-async def admin_delete_game(
+def admin_delete_game(
     game_id: int,
     db: Session = Depends(get_db),
     _: bool = Depends(verify_admin_cookie)
@@ -109,8 +177,17 @@ async def admin_delete_game(
                 print(f"删除文件失败: {e}")
     
     # 删除数据库记录
+    category_id, content_hash, directory_name = game.category_id, game.content_hash, game.directory_name
     db.delete(game)
+    db.flush()
+    # 没有其它游戏使用同样的代码时一并删除
+    release_blobs(db, content_hash)
     db.commit()
+    content_cache.invalidate(game_id)
+    response_cache.invalidate_tags(category_tag(category_id), LEADERBOARD_TAG)
+    # 多文件游戏的目录不再对外提供（其它 worker 最迟在 FUNAI_REPO_DIRECTORY_CACHE_TTL 后失效）
+    if directory_name:
+        committed_directories.invalidate(directory_name)
     
     return RedirectResponse(url="/admin/dashboard", status_code=303)
 
@@ -129,7 +206,7 @@ async def admin_logout():
 
 # --- 添加分类 ---
 @router.post("/admin/add_category")
-async def add_category(
+def add_category(
     name: str = Form(...),
     db: Session = Depends(get_db),
     _: bool = Depends(verify_admin_cookie)
@@ -144,30 +221,21 @@ async def add_category(
     new_category = Category(name=name)
     db.add(new_category)
     db.commit()
+    reference_data.invalidate_categories()
+    # 首页的分类导航出现在每个缓存页面中
+    response_cache.clear()
     
     return RedirectResponse(url="/admin/dashboard", status_code=303)
 
 # --- 关于页面管理 ---
 @router.get("/admin/about", response_class=HTMLResponse)
-async def admin_about(
+def admin_about(
     request: Request,
-    db: Session = Depends(get_db),
     _: bool = Depends(verify_admin_cookie)
 ):
     """关于页面管理"""
-    # 获取关于页面配置
-    about_config = db.query(AboutConfig).first()
-    if not about_config:
-        # 如果没有配置，创建默认配置
-        about_config = AboutConfig(
-            purpose="这是一个AI游戏实验室，旨在探索AI技术在游戏开发中的应用。",
-            reward_enabled=1,
-            reward_image_url="",
-            reward_description="感谢您的支持！"
-        )
-        db.add(about_config)
-        db.commit()
-        db.refresh(about_config)
+    # 获取关于页面配置（缓存的快照，不存在时创建默认配置）
+    about_config = reference_data.about_config()
     
     return templates.TemplateResponse(
         "admin/admin_about.html",
@@ -179,7 +247,7 @@ async def admin_about(
 
 # --- 删除分类 ---
 @router.post("/admin/delete_category/{category_id}")
-async def delete_category(
+def delete_category(
     category_id: int,
     db: Session = Depends(get_db),
     _: bool = Depends(verify_admin_cookie)
@@ -200,14 +268,36 @@ async def delete_category(
     # 删除分类
     db.delete(category)
     db.commit()
+    reference_data.invalidate_categories()
+    response_cache.clear()
     
     return RedirectResponse(url="/admin/dashboard", status_code=303)
 
 # --- 刷新游戏库 ---
 @router.get("/admin/refresh")
-async def admin_refresh_library(
+def admin_refresh_library(
     _: bool = Depends(verify_admin_cookie)
 ):
     """刷新游戏库"""
     sync_games_from_folder()
     return RedirectResponse(url="/admin/dashboard", status_code=303)
+
+# --- 运行时统计 ---
+@router.get("/admin/stats")
+async def admin_stats(
+    _: bool = Depends(verify_admin_cookie)
+):
+    """查看缓冲写回等内部子系统的运行状态"""
+    return JSONResponse({
+        "view_counter": view_counter.stats(),
+        "content_cache": content_cache.stats(),
+        "games_watcher": games_watcher.stats(),
+        "url_checker": url_checker.stats(),
+        "build_queue": build_queue.stats(),
+        "npm_cache": npm_cache.stats(),
+        "leaderboard": leaderboard_rollup.stats(),
+        "ai_navigation_cache": navigation_cache.stats(),
+        "reference_data": reference_data.stats(),
+        "response_cache": response_cache.stats(),
+        "startup_sync": startup_sync.stats(),
+    })
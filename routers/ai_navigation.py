@@ -1,19 +1,34 @@
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+import os
 import re
 import urllib.parse
-import requests
 from urllib.parse import urlparse
 
-from database import get_db, AIFeature, AICategory
+from database import get_db, SessionLocal, AIFeature, AICategory
+from url_checker import url_checker
+from ttl_cache import TTLCache
+from templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
-# 初始化默认分类
-async def init_default_categories(db: Session):
+# 分组后的“分类 → 功能”结构缓存在进程内，由功能和分类的增删改接口失效；
+# TTL 只作为兜底（例如其它进程修改了数据库）
+AI_NAVIGATION_CACHE_TTL = float(os.environ.get("FUNAI_AI_NAVIGATION_CACHE_TTL", "300"))
+navigation_cache = TTLCache(AI_NAVIGATION_CACHE_TTL, maxsize=1)
+NAVIGATION_CACHE_KEY = "categories_with_features"
+# 每次失效递增；查询期间发生写入时不把旧结果写回缓存
+_navigation_version = 0
+
+def invalidate_navigation_cache():
+    global _navigation_version
+    _navigation_version += 1
+    navigation_cache.invalidate(NAVIGATION_CACHE_KEY)
+
+# 初始化默认分类（应用启动时执行一次）
+def init_default_categories(db: Session):
     """初始化默认分类"""
     default_categories = [
         "📝 文本生成",
@@ -27,15 +42,54 @@ async def init_default_categories(db: Session):
         "🔍 其他"
     ]
     
-    for category_name in default_categories:
-        existing_category = db.query(AICategory).filter(AICategory.name == category_name).first()
-        if not existing_category:
-            new_category = AICategory(name=category_name)
-            db.add(new_category)
-    db.commit()
+    # 一次查询取出已有分类名，只插入缺少的
+    existing_names = {name for (name,) in db.query(AICategory.name).filter(AICategory.name.in_(default_categories))}
+    missing = [AICategory(name=category_name) for category_name in default_categories if category_name not in existing_names]
+    if missing:
+        db.add_all(missing)
+        db.commit()
+        invalidate_navigation_cache()
+
+def load_categories_with_features(db: Session) -> list:
+    """读取缓存的分组结构，未命中时查询并按分类分组"""
+    categories_with_features = navigation_cache.get(NAVIGATION_CACHE_KEY)
+    if categories_with_features is not None:
+        return categories_with_features
+    version = _navigation_version
+
+    # 从数据库获取所有分类和已通过审核的AI功能
+    categories = db.query(AICategory).all()
+    ai_features = db.query(AIFeature).filter(AIFeature.is_approved == 1).all()
+
+    # 按分类ID一次遍历分组；缓存普通字典，不持有会话中的 ORM 对象
+    features_by_category = {}
+    for feature in ai_features:
+        features_by_category.setdefault(feature.category_id, []).append({
+            "id": feature.id,
+            "title": feature.title,
+            "url": feature.url,
+            "description": feature.description,
+            "company_name": feature.company_name,
+        })
+    categories_with_features = [
+        {"id": category.id, "name": category.name, "features": features_by_category[category.id]}
+        for category in categories
+        if category.id in features_by_category
+    ]
+    if version == _navigation_version:
+        navigation_cache.set(NAVIGATION_CACHE_KEY, categories_with_features)
+    return categories_with_features
+
+def seed_default_categories():
+    """应用启动时补齐默认分类"""
+    db = SessionLocal()
+    try:
+        init_default_categories(db)
+    finally:
+        db.close()
 
 # 从URL提取公司名
-async def extract_company_name(url: str):
+def extract_company_name(url: str):
     """从URL提取公司名"""
     try:
         # 解析URL
@@ -116,48 +170,15 @@ async def check_url_validity(url: str):
         if domain in trusted_domains or any(domain.endswith(f".{trusted}") for trusted in trusted_domains):
             return True
         
-        # 尝试HEAD请求，超时时间增加到10秒
-        try:
-            response = requests.head(url, timeout=10, allow_redirects=True, headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            })
-            return response.status_code < 400
-        except Exception:
-            # HEAD请求失败，尝试GET请求但只获取前1000字节
-            try:
-                response = requests.get(url, timeout=10, allow_redirects=True, stream=True, headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                })
-                response.raw.read(1000)
-                return response.status_code < 400
-            except Exception:
-                return False
+        # 通过共享的异步客户端检查（带连接池、单主机并发限制和结果缓存）
+        return await url_checker.check(url)
     except Exception as e:
         return False
 
 @router.get("/ai_navigation", response_class=HTMLResponse)
-async def ai_navigation(request: Request, db: Session = Depends(get_db)):
+def ai_navigation(request: Request, db: Session = Depends(get_db)):
     """AI导航页面"""
-    # 初始化默认分类
-    await init_default_categories(db)
-    
-    # 从数据库获取所有分类
-    categories = db.query(AICategory).all()
-    
-    # 从数据库获取所有已通过审核的AI功能
-    ai_features = db.query(AIFeature).filter(AIFeature.is_approved == 1).all()
-    
-    # 按分类分组
-    categories_with_features = []
-    for category in categories:
-        # 获取该分类下的所有AI功能
-        features = [feature for feature in ai_features if feature.category_id == category.id]
-        if features:
-            categories_with_features.append({
-                "id": category.id,
-                "name": category.name,
-                "features": features
-            })
+    categories_with_features = load_categories_with_features(db)
     
     return templates.TemplateResponse("ai_navigation.html", {"request": request, "categories": categories_with_features})
 
@@ -176,7 +197,9 @@ async def handle_add_ai_feature(
 ):
     """处理增加AI功能的表单提交"""
     # 检查是否重复（标题或URL）
-    existing_feature = db.query(AIFeature).filter((AIFeature.title == title) | (AIFeature.url == url)).first()
+    existing_feature = await run_in_threadpool(
+        lambda: db.query(AIFeature).filter((AIFeature.title == title) | (AIFeature.url == url)).first()
+    )
     if existing_feature:
         return JSONResponse({"success": False, "message": "该AI功能已存在或URL已被使用"})
     
@@ -186,7 +209,7 @@ async def handle_add_ai_feature(
         return JSONResponse({"success": False, "message": "链接无效，请检查URL是否正确"})
     
     # 提取公司名
-    company_name = await extract_company_name(url)
+    company_name = extract_company_name(url)
     
     # 创建新的AI功能，默认已审核
     new_feature = AIFeature(
@@ -199,15 +222,19 @@ async def handle_add_ai_feature(
     )
     
     # 保存到数据库
-    db.add(new_feature)
-    db.commit()
-    db.refresh(new_feature)
+    await run_in_threadpool(save_feature, db, new_feature)
     
     return JSONResponse({"success": True, "message": "AI链接已成功添加"})
 
+def save_feature(db: Session, feature: AIFeature):
+    db.add(feature)
+    db.commit()
+    db.refresh(feature)
+    invalidate_navigation_cache()
+
 # 分类管理路由
 @router.post("/ai_navigation/add_category")
-async def add_category(
+def add_category(
     name: str = Form(...),
     db: Session = Depends(get_db)
 ):
@@ -222,11 +249,12 @@ async def add_category(
     db.add(new_category)
     db.commit()
     db.refresh(new_category)
+    invalidate_navigation_cache()
     
     return JSONResponse({"success": True, "message": "分类已成功添加"})
 
 @router.post("/ai_navigation/delete_category/{category_id}")
-async def delete_category(
+def delete_category(
     category_id: int,
     db: Session = Depends(get_db)
 ):
@@ -239,15 +267,13 @@ async def delete_category(
     # 删除分类
     db.delete(category)
     db.commit()
+    invalidate_navigation_cache()
     
     return JSONResponse({"success": True, "message": "分类已成功删除"})
 
 @router.get("/ai_navigation/categories")
-async def get_categories(db: Session = Depends(get_db)):
+def get_categories(db: Session = Depends(get_db)):
     """获取所有分类"""
-    # 初始化默认分类
-    await init_default_categories(db)
-    
     # 从数据库获取所有分类
     categories = db.query(AICategory).all()
     
@@ -265,12 +291,9 @@ def verify_admin_cookie(request: Request):
     return True
 
 @router.get("/ai_navigation/admin", response_class=HTMLResponse)
-async def ai_navigation_admin(request: Request, db: Session = Depends(get_db), _: bool = Depends(verify_admin_cookie)):
+def ai_navigation_admin(request: Request, db: Session = Depends(get_db), _: bool = Depends(verify_admin_cookie)):
     """AI导航管理页面"""
     try:
-        # 初始化默认分类
-        await init_default_categories(db)
-        
         # 从数据库获取所有分类
         categories = db.query(AICategory).all()
         
@@ -286,12 +309,9 @@ async def ai_navigation_admin(request: Request, db: Session = Depends(get_db), _
         return f"<h1>错误</h1><p>{str(e)}</p>"
 
 @router.get("/admin/ai_navigation", response_class=HTMLResponse)
-async def admin_ai_navigation(request: Request, db: Session = Depends(get_db), _: bool = Depends(verify_admin_cookie)):
+def admin_ai_navigation(request: Request, db: Session = Depends(get_db), _: bool = Depends(verify_admin_cookie)):
     """AI导航管理页面（从admin路由访问）"""
     try:
-        # 初始化默认分类
-        await init_default_categories(db)
-        
         # 从数据库获取所有分类
         categories = db.query(AICategory).all()
         
@@ -307,7 +327,7 @@ async def admin_ai_navigation(request: Request, db: Session = Depends(get_db), _
         return f"<h1>错误</h1><p>{str(e)}</p>"
 
 @router.get("/ai_navigation/get_feature/{feature_id}")
-async def get_feature(feature_id: int, db: Session = Depends(get_db), _: bool = Depends(verify_admin_cookie)):
+def get_feature(feature_id: int, db: Session = Depends(get_db), _: bool = Depends(verify_admin_cookie)):
     """获取AI功能详情"""
     feature = db.query(AIFeature).filter(AIFeature.id == feature_id).first()
     if not feature:
@@ -323,7 +343,7 @@ async def get_feature(feature_id: int, db: Session = Depends(get_db), _: bool =
     }
 
 @router.post("/ai_navigation/update_feature/{feature_id}")
-async def update_feature(
+def update_feature(
     feature_id: int,
     title: str = Form(...),
     url: str = Form(...),
@@ -363,11 +383,12 @@ async def update_feature(
     # 保存到数据库
     db.commit()
     db.refresh(feature)
+    invalidate_navigation_cache()
     
     return JSONResponse({"success": True, "message": "AI功能已成功更新"})
 
 @router.post("/ai_navigation/delete_feature/{feature_id}")
-async def delete_feature(feature_id: int, db: Session = Depends(get_db), _: bool = Depends(verify_admin_cookie)):
+def delete_feature(feature_id: int, db: Session = Depends(get_db), _: bool = Depends(verify_admin_cookie)):
     """删除AI功能"""
     # 检查AI功能是否存在
     feature = db.query(AIFeature).filter(AIFeature.id == feature_id).first()
@@ -377,5 +398,6 @@ async def delete_feature(feature_id: int, db: Session = Depends(get_db), _: bool
     # 删除AI功能
     db.delete(feature)
     db.commit()
+    invalidate_navigation_cache()
     
     return JSONResponse({"success": True, "message": "AI功能已成功删除"})
\ No newline at end of file
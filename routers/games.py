@@ -1,57 +1,79 @@
 import os
 import uuid
-import shutil
-import zipfile
-import re
-import subprocess
-import logging
 from fastapi import APIRouter, Request, Depends, Form, HTTPException, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-
-from tools.npm_build_helper import build_project
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, update, func, cast, Float, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, defer
 
 # 从父级目录导入数据库和工具函数
-from database import get_db, Game, Category
-from utils import sync_games_from_folder
+from database import get_db, SessionLocal, Game, RatingEvent, query_game_listing, read_counter, category_counter_name
+from utils import sync_games_from_folder, load_game_html, write_game_file
+from content_cache import content_cache
+from blob_store import blob_fields, release_blobs
+from response_cache import response_cache, category_tag, LEADERBOARD_TAG
+from view_counter import view_counter
+from build_queue import build_queue
+from leaderboard_rollup import record_daily_stats
+from reference_data import reference_data
+from search import search_games, SEARCH_PER_PAGE
+from zip_ingest import detach_upload, inspect_zip, ZipLimitError
+from templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
-
-# --- 构建辅助函数 ---
-def needs_build(directory: str) -> bool:
-    """检查目录是否包含需要构建的 Node.js 项目"""
-    return os.path.exists(os.path.join(directory, "package.json"))
-
-def find_build_output_dir(directory: str) -> str:
-    """查找构建输出目录 (dist, build, 或 out)"""
-    common_dirs = ['dist', 'build', 'out']
-    for dir_name in common_dirs:
-        dir_path = os.path.join(directory, dir_name)
-        if os.path.exists(dir_path) and os.path.isdir(dir_path):
-            return dir_name
-    return None
+
+# 首页和 /api/games 每页显示的游戏数量
+GAMES_PER_PAGE = 12
+
+def encode_cursor(game: Game) -> str:
+    """游标为最后一条记录的 (views, id)，下一页从它之后继续"""
+    return f"{game.views}_{game.id}"
+
+def decode_cursor(cursor: str):
+    try:
+        views, game_id = cursor.split("_")
+        return int(views), int(game_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def query_games_after(db: Session, category_id: int, cursor: str, limit: int) -> list:
+    """按 (views, id) 倒序的键集分页，直接在 ix_games_category_views 上定位，与页码深度无关"""
+    query = query_game_listing(db).filter(Game.category_id == category_id)
+    if cursor:
+        query = query.filter(tuple_(Game.views, Game.id) < tuple_(*decode_cursor(cursor)))
+    return query.order_by(Game.views.desc(), Game.id.desc()).limit(limit).all()
 
 @router.get("/", response_class=HTMLResponse)
-async def index(request: Request, category_id: int = None, page: int = 1, db: Session = Depends(get_db)):
-    # 获取所有分类
-    categories = db.query(Category).all()
-    
-    # 每页显示的游戏数量
-    per_page = 12
-    offset = (page - 1) * per_page
-    
+def index(request: Request, category_id: int = None, page: int = 1):
     # 如果没有提供分类ID，默认使用游戏分类（ID=1）
     if not category_id:
         category_id = 1
+    page = max(page, 1)
     
-    # 根据分类筛选游戏
-    query = db.query(Game).filter(Game.category_id == category_id)
+    # 同一分类同一页对所有访客相同，渲染结果放在页面缓存中，由写操作按分类失效
+    return response_cache.get_or_render(
+        ("index", category_id, page), (category_tag(category_id),), "text/html; charset=utf-8",
+        lambda db: render_index(request, db, category_id, page)
+    )
+
+def render_index(request: Request, db: Session, category_id: int, page: int) -> bytes:
+    # 获取所有分类（缓存的快照）
+    categories = reference_data.categories()
+    
+    # 每页显示的游戏数量
+    per_page = GAMES_PER_PAGE
+    offset = (page - 1) * per_page
     
-    # 获取总数和分页数据
-    total_games = query.count()
-    games = query.order_by(Game.views.desc()).offset(offset).limit(per_page).all()
+    # 总数来自触发器维护的分类计数器，不再扫描
+    total_games = read_counter(db, category_counter_name(category_id))
+    if page == 1:
+        games = query_games_after(db, category_id, None, per_page)
+    else:
+        games = (query_game_listing(db).filter(Game.category_id == category_id)
+                 .order_by(Game.views.desc(), Game.id.desc()).offset(offset).limit(per_page).all())
+    # 无限滚动从最后一条记录的游标继续加载
+    next_cursor = encode_cursor(games[-1]) if games and offset + len(games) < total_games else None
     
     return templates.TemplateResponse(
         "index.html", 
@@ -61,65 +83,93 @@ async def index(request: Request, category_id: int = None, page: int = 1, db: Se
             "categories": categories,
             "selected_category": category_id,
             "current_page": page,
-            "total_pages": (total_games + per_page - 1) // per_page
+            "total_pages": (total_games + per_page - 1) // per_page,
+            "next_cursor": next_cursor
         }
-    )
+    ).body
 
 @router.get("/api/games")
-async def get_games(category_id: int = None, page: int = 1, db: Session = Depends(get_db)):
-    """API端点：获取游戏列表，支持分页和分类筛选"""
-    # 每页显示的游戏数量
-    per_page = 12
-    offset = (page - 1) * per_page
-    
+def get_games(category_id: int = None, page: int = 1, cursor: str = None):
+    """API端点：获取游戏列表，支持分类筛选；传 cursor 时使用键集分页，否则按页码分页"""
     # 如果没有提供分类ID，默认使用游戏分类（ID=1）
     if not category_id:
         category_id = 1
+    page = max(page, 1)
+    # 游标格式错误时直接返回 400，不进入缓存
+    if cursor:
+        decode_cursor(cursor)
     
-    # 根据分类筛选游戏
-    query = db.query(Game).filter(Game.category_id == category_id)
+    key = ("api_games", category_id, "cursor", cursor) if cursor is not None else ("api_games", category_id, "page", page)
+    return response_cache.get_or_render(
+        key, (category_tag(category_id),), "application/json",
+        lambda db: JSONResponse(list_games(db, category_id, page, cursor)).body
+    )
+
+def list_games(db: Session, category_id: int, page: int, cursor: str) -> dict:
+    # 每页显示的游戏数量
+    per_page = GAMES_PER_PAGE
     
-    # 获取总数和分页数据
-    total_games = query.count()
-    games = query.order_by(Game.views.desc()).offset(offset).limit(per_page).all()
+    if cursor is not None:
+        # 多取一条用于判断是否还有下一页
+        games = query_games_after(db, category_id, cursor, per_page + 1)
+        has_more = len(games) > per_page
+        games = games[:per_page]
+        return {
+            "games": [game_card(game) for game in games],
+            "next_cursor": encode_cursor(games[-1]) if has_more else None
+        }
     
-    # 转换为字典列表，方便JSON序列化
-    games_data = []
-    for game in games:
-        games_data.append({
-            "id": game.id,
-            "title": game.title,
-            "author": game.author,
-            "ai_model": game.ai_model,
-            "description": game.description,
-            "views": game.views,
-            "rating": game.rating
-        })
+    offset = (page - 1) * per_page
+    # 根据分类筛选游戏（只加载卡片字段），总数来自分类计数器
+    total_games = read_counter(db, category_counter_name(category_id))
+    games = (query_game_listing(db).filter(Game.category_id == category_id)
+             .order_by(Game.views.desc(), Game.id.desc()).offset(offset).limit(per_page).all())
     
     return {
-        "games": games_data,
+        "games": [game_card(game) for game in games],
         "total_pages": (total_games + per_page - 1) // per_page,
         "current_page": page
     }
 
+@router.get("/api/search")
+def search(q: str = "", category_id: int = None, page: int = 1, db: Session = Depends(get_db)):
+    """API端点：全文检索游戏（标题、简介、作者、AI模型、提示词），按相关度排序并分页"""
+    page = max(page, 1)
+    games, total = search_games(db, q.strip(), category_id, page)
+    
+    return {
+        "games": [game_card(game) for game in games],
+        "total": total,
+        "total_pages": (total + SEARCH_PER_PAGE - 1) // SEARCH_PER_PAGE,
+        "current_page": page
+    }
+
+def game_card(game: Game) -> dict:
+    """转换为字典，方便JSON序列化"""
+    return {
+        "id": game.id,
+        "title": game.title,
+        "author": game.author,
+        "ai_model": game.ai_model,
+        "description": game.description,
+        "views": game.views,
+        "rating": game.rating
+    }
+
 @router.get("/play/{game_id}", response_class=HTMLResponse)
-async def play(request: Request, game_id: int, db: Session = Depends(get_db)):
-    game = db.query(Game).filter(Game.id == game_id).first()
+def play(request: Request, game_id: int, db: Session = Depends(get_db)):
+    # 游戏代码由 /content 单独加载，这里不需要 html_code
+    game = db.query(Game).options(defer(Game.html_code)).filter(Game.id == game_id).first()
     if not game: return HTMLResponse("游戏未找到", 404)
     
-    game.views += 1
-    db.commit()
-    db.refresh(game)
+    # 浏览量先记在内存里，由后台任务批量写回
+    view_counter.incr(game.id)
     return templates.TemplateResponse("play.html", {"request": request, "game": game})
 
 # --- ⭐ 新增：处理游戏评分 ---
 @router.post("/rate/{game_id}")
 async def rate_game(request: Request, game_id: int, db: Session = Depends(get_db)):
     """接收用户对游戏的评分"""
-    game = db.query(Game).filter(Game.id == game_id).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-
     try:
         data = await request.json()
         rating = data.get("rating")
@@ -129,24 +179,51 @@ async def rate_game(request: Request, game_id: int, db: Session = Depends(get_db
     if rating is None or not (isinstance(rating, int) and 1 <= rating <= 5):
         raise HTTPException(status_code=400, detail="Invalid rating. Must be an integer between 1 and 5.")
 
-    game.rating_total += rating
-    game.rating_count += 1
-    game.rating = round(game.rating_total / game.rating_count, 1)
-    
+    client_id = request.client.host if request.client else "unknown"
+    return await run_in_threadpool(apply_rating, db, game_id, client_id, rating)
+
+def apply_rating(db: Session, game_id: int, client_id: str, rating: int) -> dict:
+    """写入评分记录并原子地更新游戏评分（在线程池中执行）"""
+    # 先在数据库内原子地累加评分并返回最新结果（SET 中引用的都是更新前的值），
+    # 游戏不存在时直接 404，不会被已删除游戏遗留的评分记录误判为重复评分
+    result = db.execute(
+        update(Game)
+        .where(Game.id == game_id)
+        .values(
+            rating_total=Game.rating_total + rating,
+            rating_count=Game.rating_count + 1,
+            rating=func.round(cast(Game.rating_total + rating, Float) / (Game.rating_count + 1), 1)
+        )
+        .returning(Game.rating, Game.rating_count, Game.category_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if result is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Game not found")
+
+    # 同一事务内写评分记录，(game_id, client_id) 唯一索引拒绝重复评分时连同上面的累加一起回滚
+    try:
+        db.execute(insert(RatingEvent).values(game_id=game_id, client_id=client_id, rating=rating))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="You have already rated this game.")
+
+    record_daily_stats(db, [{"game_id": game_id, "rating_sum": rating, "rating_count": 1}])
     db.commit()
-    db.refresh(game)
+    # 列表卡片显示评分，排行榜快照的下一次刷新会单独失效排行榜页面
+    response_cache.invalidate_tags(category_tag(result.category_id))
 
-    return {"rating": game.rating, "rating_count": game.rating_count}
+    return {"rating": result.rating, "rating_count": result.rating_count}
 
 # --- ⭐ 新增：显示上传页面 ---
 @router.get("/upload", response_class=HTMLResponse)
-async def upload_page(request: Request, db: Session = Depends(get_db)):
-    categories = db.query(Category).all()
+def upload_page(request: Request):
+    categories = reference_data.categories()
     return templates.TemplateResponse("upload.html", {"request": request, "categories": categories})
 
 # --- ⭐ 新增：处理上传请求 ---
 @router.post("/upload")
-async def handle_upload(
+def handle_upload(
     title: str = Form(...),
     author: str = Form(...),
     ai_model: str = Form(...),
@@ -162,78 +239,11 @@ async def handle_upload(
     # 1. 生成唯一ID
     unique_id = uuid.uuid4().hex[:8]
     filename = f"upload_{unique_id}.html"
-    
-    is_multi_file = 0
-    directory_name = ""
-    final_html_code = html_code or ""
 
-    # 处理 Zip 文件
-    if zip_file and zip_file.filename.endswith(".zip"):
-        is_multi_file = 1
-        directory_name = unique_id
-        upload_dir = os.path.join("games_repo", directory_name)
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # 保存并解压 zip 文件
-        zip_content = await zip_file.read()
-        zip_path = os.path.join(upload_dir, "temp.zip")
-        
-        with open(zip_path, "wb") as f:
-            f.write(zip_content)
-        
-        # 解压 zip 文件
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(upload_dir)
-            os.remove(zip_path)
-        except Exception as e:
-            shutil.rmtree(upload_dir, ignore_errors=True)
-            raise HTTPException(status_code=400, detail=f"解压ZIP文件失败: {str(e)}")
-        
-        # 检查项目是否需要构建
-        if needs_build(upload_dir):
-            # 构建项目
-            success, error_msg = build_project(upload_dir)
-            if not success:
-                shutil.rmtree(upload_dir, ignore_errors=True)
-                raise HTTPException(status_code=400, detail=f"项目构建失败: {error_msg}")
-            
-            # 查找并使用构建输出目录
-            build_dir = find_build_output_dir(upload_dir)
-            if not build_dir:
-                shutil.rmtree(upload_dir, ignore_errors=True)
-                raise HTTPException(
-                    status_code=400, 
-                    detail="构建成功但未找到输出目录（dist/build/out）。请确保项目的构建脚本会生成这些目录之一。"
-                )
-            
-            # 将构建输出移到根目录并清理源文件
-            build_path = os.path.join(upload_dir, build_dir)
-            temp_dir = upload_dir + "_temp"
-            shutil.move(build_path, temp_dir)
-            shutil.rmtree(upload_dir)
-            shutil.move(temp_dir, upload_dir)
-        
-        # 验证 index.html 存在（构建后或解压后）
-        index_path = os.path.join(upload_dir, "index.html")
-        if not os.path.exists(index_path):
-            shutil.rmtree(upload_dir, ignore_errors=True)
-            raise HTTPException(
-                status_code=400,
-                detail="未找到 index.html 文件。请确保 ZIP 包含 index.html（或构建后生成 index.html）。"
-            )
-    
     # 确定最终的 AI 模型名称
     final_ai_model = custom_ai_model if ai_model == "其他" and custom_ai_model else ai_model
-    
-    # 当没有上传 zip 文件时，使用单文件模式
-    if not zip_file or not zip_file.filename.endswith(".zip"):
-        file_path = os.path.join("games_repo", filename)
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(html_code)
 
-    # 3. 存入数据库
-    new_game = Game(
+    game_fields = dict(
         title=title,
         author=author,
         ai_model=final_ai_model, 
@@ -241,65 +251,101 @@ async def handle_upload(
         prompt=prompt,
         category_id=category_id,        # 新增：分类ID
         filename=filename,
-        html_code=final_html_code,
+        html_code=html_code or "",
         edit_password=edit_password,
-        is_multi_file=is_multi_file,
-        directory_name=directory_name
+        is_multi_file=0,
+        directory_name=""
     )
+
+    # 处理 Zip 文件：保存后交给后台构建队列，校验通过后才写入数据库
+    if zip_file and zip_file.filename.endswith(".zip"):
+        upload_dir = os.path.join("games_repo", unique_id)
+        # 请求体大小已由 UploadSizeLimitMiddleware 限制；直接接管 Starlette 的临时文件交给构建任务，
+        # 不再复制到上传目录，先只读中央目录做一次快速预检，明显超限的压缩包直接拒绝
+        try:
+            archive = detach_upload(zip_file.file)
+        except ZipLimitError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            inspect_zip(archive)
+        except ZipLimitError as e:
+            archive.close()
+            raise HTTPException(status_code=400, detail=str(e))
+
+        game_fields.update(is_multi_file=1, directory_name=unique_id)
+        job = build_queue.submit(upload_dir, archive, game_fields)
+
+        # 跳转到构建进度页，完成后再进入游戏页面
+        return RedirectResponse(url=f"/upload/jobs/{job.id}", status_code=303)
+    
+    # 当没有上传 zip 文件时，使用单文件模式
+    # 3. 存入数据库，游戏代码写入内容寻址存储（相同内容只存一份）
+    game_fields.update(blob_fields(db, html_code))
+    new_game = Game(**game_fields)
     db.add(new_game)
     db.commit()
     db.refresh(new_game)
+
+    # 提交后再写入 games_repo：目录监听看到文件时游戏记录已经存在，不会另插一条
+    write_game_file(filename, html_code)
+    response_cache.invalidate_tags(category_tag(new_game.category_id))
     
     # 4.直接跳转到玩游戏页面
     return RedirectResponse(url=f"/play/{new_game.id}", status_code=303)
 
+# --- 构建任务进度 ---
+@router.get("/upload/jobs/{job_id}", response_class=HTMLResponse)
+def upload_job_page(request: Request, job_id: str):
+    job = build_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Build job not found")
+    return templates.TemplateResponse("upload_status.html", {"request": request, "job": job.to_dict()})
+
+@router.get("/api/upload/jobs/{job_id}")
+def upload_job_status(job_id: str):
+    """API端点：查询 ZIP 上传构建任务的状态和进度"""
+    job = build_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Build job not found")
+    return job.to_dict()
+
 @router.get("/refresh")
-async def refresh_library():
+def refresh_library():
     sync_games_from_folder()
     return RedirectResponse(url="/")
 
 # --- ⭐ 修复：新增一个接口，专门只返回游戏的纯 HTML 代码 ---
 @router.get("/content/{game_id}", response_class=HTMLResponse)
-async def game_content(game_id: int, db: Session = Depends(get_db)):
-    game = db.query(Game).filter(Game.id == game_id).first()
-    if not game:
-        return HTMLResponse("Game not found", status_code=404)
-    
-    if game.is_multi_file:
-        # 为多文件游戏读取并修改 index.html，注入 base 标签以修复资源路径问题
-        index_file_path = os.path.join("games_repo", game.directory_name, "index.html")
-        
-        # 检查 index.html 是否存在
-        if not os.path.exists(index_file_path):
-            return HTMLResponse("Game index.html not found", status_code=404)
-        
-        # 读取游戏的 index.html 内容
-        try:
-            with open(index_file_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-        except Exception as e:
-            return HTMLResponse(f"Error reading game file: {str(e)}", status_code=500)
-        
-        # 在 <head> 标签后注入 <base> 标签，确保所有路径相对于游戏目录解析
-        base_tag = f'<base href="/repo/{game.directory_name}/">'
-        
-        # 查找 <head> 标签并在其后插入 base 标签
-        head_pattern = re.compile(r'(<head[^>]*>)', re.IGNORECASE)
-        match = head_pattern.search(html_content)
-        
-        if match:
-            insert_pos = match.end()
-            modified_html = html_content[:insert_pos] + '\n    ' + base_tag + html_content[insert_pos:]
-        else:
-            modified_html = base_tag + '\n' + html_content
-        
-        return HTMLResponse(content=modified_html)
-    else:
-        return HTMLResponse(content=game.html_code)
+async def game_content(game_id: int):
+    # 先查内存缓存，命中时不打开数据库会话、不进线程池
+    cached = content_cache.get(game_id)
+    if cached is not None:
+        return HTMLResponse(content=cached)
+
+    # 未命中时查库和读盘都放到线程池，避免阻塞事件循环
+    return await run_in_threadpool(load_game_content, game_id)
+
+def load_game_content(game_id: int) -> HTMLResponse:
+    # 加载期间如果游戏被编辑或删除，结果不写回缓存
+    generation = content_cache.generation(game_id)
+    db = SessionLocal()
+    try:
+        game = db.query(Game).filter(Game.id == game_id).first()
+        if not game:
+            return HTMLResponse("Game not found", status_code=404)
+        html_content = load_game_html(db, game)
+    except FileNotFoundError:
+        return HTMLResponse("Game index.html not found", status_code=404)
+    except Exception as e:
+        return HTMLResponse(f"Error reading game file: {str(e)}", status_code=500)
+    finally:
+        db.close()
+
+    return HTMLResponse(content=content_cache.put(game_id, html_content, generation))
 
 # --- ⭐ 新增：编辑页面 ---
 @router.get("/edit/{game_id}", response_class=HTMLResponse)
-async def edit_page(request: Request, game_id: int, db: Session = Depends(get_db)):
+def edit_page(request: Request, game_id: int, db: Session = Depends(get_db)):
     game = db.query(Game).filter(Game.id == game_id).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -307,7 +353,7 @@ async def edit_page(request: Request, game_id: int, db: Session = Depends(get_db
 
 # --- ⭐ 新增：处理编辑请求 ---
 @router.post("/edit/{game_id}")
-async def handle_edit(
+def handle_edit(
     game_id: int,
     title: str = Form(...),
     author: str = Form(...),
@@ -336,15 +382,20 @@ async def handle_edit(
     game.ai_model = final_ai_model
     game.description = description
     game.prompt = prompt
-    game.html_code = html_code
-    
-    # 更新文件内容（仅单文件游戏）
-    if not game.is_multi_file:
-        file_path = os.path.join("games_repo", game.filename)
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(html_code)
+    previous_hash = game.content_hash
+    for field, value in blob_fields(db, html_code).items():
+        setattr(game, field, value)
 
+    db.flush()
+    if previous_hash != game.content_hash:
+        release_blobs(db, previous_hash)
     db.commit()
     db.refresh(game)
 
+    # 提交后更新文件内容（仅单文件游戏）
+    if not game.is_multi_file:
+        write_game_file(game.filename, html_code)
+    content_cache.invalidate(game.id)
+    response_cache.invalidate_tags(category_tag(game.category_id), LEADERBOARD_TAG)
+
     return RedirectResponse(url=f"/play/{game.id}", status_code=303)
\ No newline at end of file
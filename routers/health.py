@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from startup_sync import startup_sync
+
+router = APIRouter()
+
+@router.get("/ready")
+def ready():
+    """就绪检查：启动同步完成前返回 503 和同步进度，供负载均衡/部署脚本判断何时切流量"""
+    return JSONResponse(startup_sync.stats(), status_code=200 if startup_sync.ready else 503)
@@ -0,0 +1,109 @@
+import os
+import mimetypes
+from fastapi import APIRouter, Request
+from fastapi.responses import FileResponse, Response
+
+from database import SessionLocal, Game
+from ttl_cache import TTLCache
+
+router = APIRouter()
+
+GAMES_REPO_DIR = os.path.realpath("games_repo")
+
+# 多文件游戏目录以 uuid 命名且上传后不会原地修改，资源可以被浏览器永久缓存
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# 只有已写入数据库的多文件游戏目录才对外提供：构建中的目录还包含源码、temp.zip 和 node_modules。
+# 目录名 -> 是否已提交；不存在的结果只短暂缓存，构建完成后很快可以访问
+REPO_DIRECTORY_CACHE_TTL = float(os.environ.get("FUNAI_REPO_DIRECTORY_CACHE_TTL", "300"))
+REPO_DIRECTORY_NEGATIVE_TTL = float(os.environ.get("FUNAI_REPO_DIRECTORY_NEGATIVE_TTL", "2"))
+committed_directories = TTLCache(REPO_DIRECTORY_CACHE_TTL, maxsize=4096)
+
+# 系统 mimetypes 表里常缺少或不准确的游戏资源类型
+EXTRA_MIME_TYPES = {
+    ".js": "text/javascript",
+    ".mjs": "text/javascript",
+    ".css": "text/css",
+    ".json": "application/json",
+    ".map": "application/json",
+    ".wasm": "application/wasm",
+    ".svg": "image/svg+xml",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+    ".ktx2": "image/ktx2",
+    ".glb": "model/gltf-binary",
+    ".gltf": "model/gltf+json",
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+    ".wav": "audio/wav",
+    ".m4a": "audio/mp4",
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".woff": "font/woff",
+    ".woff2": "font/woff2",
+    ".ttf": "font/ttf",
+    ".otf": "font/otf",
+}
+
+def guess_media_type(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in EXTRA_MIME_TYPES:
+        return EXTRA_MIME_TYPES[ext]
+    media_type, _ = mimetypes.guess_type(path)
+    return media_type or "application/octet-stream"
+
+def resolve_asset_path(directory_name: str, asset_path: str):
+    """把 URL 路径解析为 games_repo/<directory_name> 下的真实文件，越界时返回 None"""
+    if not directory_name or directory_name in (".", "..") or "/" in directory_name or "\\" in directory_name:
+        return None
+    game_dir = os.path.join(GAMES_REPO_DIR, directory_name)
+    full_path = os.path.realpath(os.path.join(game_dir, asset_path or "index.html"))
+    if not full_path.startswith(game_dir + os.sep):
+        return None
+    return full_path
+
+def is_committed_directory(directory_name: str) -> bool:
+    committed = committed_directories.get(directory_name)
+    if committed is None:
+        db = SessionLocal()
+        try:
+            committed = db.query(Game.id).filter(
+                Game.directory_name == directory_name, Game.is_multi_file == 1
+            ).first() is not None
+        finally:
+            db.close()
+        committed_directories.set(directory_name, committed, ttl=None if committed else REPO_DIRECTORY_NEGATIVE_TTL)
+    return committed
+
+@router.api_route("/repo/{directory_name}/{asset_path:path}", methods=["GET", "HEAD"])
+def repo_asset(request: Request, directory_name: str, asset_path: str):
+    """多文件游戏的静态资源（配合 /content 注入的 <base href="/repo/<dir>/">）
+
+    普通 def：stat 和查库由 Starlette 放到线程池执行，不阻塞事件循环。
+    """
+    full_path = resolve_asset_path(directory_name, asset_path)
+    if full_path is None or not is_committed_directory(directory_name):
+        return Response("Not found", status_code=404)
+
+    try:
+        stat_result = os.stat(full_path)
+    except OSError:
+        return Response("Not found", status_code=404)
+    if not os.path.isfile(full_path):
+        return Response("Not found", status_code=404)
+
+    # 目录内容不可变，用 size + mtime 构造强 ETag，无需读取文件内容
+    etag = f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+    headers = {"etag": etag, "cache-control": IMMUTABLE_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse 负责 Range（音视频拖动）、If-Range 和 HEAD（只发送响应头），文件按块读取发送
+    return FileResponse(
+        full_path,
+        media_type=guess_media_type(full_path),
+        headers=headers,
+        stat_result=stat_result,
+    )
@@ -0,0 +1,56 @@
+from sqlalchemy import func, or_, select, text, table, column, literal_column
+from sqlalchemy.orm import Session
+
+from database import Game, query_game_listing
+
+# --- 游戏全文检索 ---
+# games_fts 使用 trigram 分词，每个检索词至少 3 个字符才能走索引，结果按 bm25 相关度排序；
+# 全部检索词都更短时退回到 LIKE 子串匹配，按浏览量排序。
+MIN_FTS_TERM_LENGTH = 3
+MAX_QUERY_TERMS = 8
+SEARCH_PER_PAGE = 12
+# bm25 列权重，顺序与 games_fts 的列一致：title, description, author, ai_model, prompt
+BM25_WEIGHTS = (10.0, 3.0, 5.0, 2.0, 1.0)
+
+games_fts = table("games_fts", column("rowid"))
+
+def split_terms(query: str) -> list:
+    return query.split()[:MAX_QUERY_TERMS]
+
+def build_fts_query(terms: list) -> str:
+    """每个检索词作为短语加引号（转义内部引号），多个词之间为 AND"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def search_games(db: Session, query: str, category_id: int = None, page: int = 1, per_page: int = SEARCH_PER_PAGE):
+    """检索游戏，返回 (当前页游戏列表, 总数)"""
+    terms = split_terms(query)
+    if not terms:
+        return [], 0
+
+    filters = [Game.category_id == category_id] if category_id else []
+    long_terms = [term for term in terms if len(term) >= MIN_FTS_TERM_LENGTH]
+    # 不足 3 个字符的检索词用 LIKE 匹配；有长检索词时只在 FTS 命中的行上判断
+    searchable = (Game.title, Game.description, Game.author, Game.ai_model, Game.prompt)
+    for term in terms:
+        if len(term) < MIN_FTS_TERM_LENGTH:
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            filters.append(or_(*(col.like(pattern, escape="\\") for col in searchable)))
+
+    games_query = query_game_listing(db)
+    if long_terms:
+        match = text("games_fts MATCH :fts_query").bindparams(fts_query=build_fts_query(long_terms))
+        # 计数用 IN 子查询：与分类条件直接 JOIN 时 SQLite 会改为按分类索引逐行执行 MATCH
+        matched_ids = select(games_fts.c.rowid).where(match)
+        total = db.query(func.count(Game.id)).filter(Game.id.in_(matched_ids), *filters).scalar()
+        rank = func.bm25(literal_column("games_fts"), *BM25_WEIGHTS)
+        games_query = games_query.join(games_fts, games_fts.c.rowid == Game.id).filter(match, *filters)
+        order = (rank, Game.id)
+    else:
+        games_query = games_query.filter(*filters)
+        total = games_query.count()
+        order = (Game.views.desc(), Game.id)
+
+    if not total:
+        return [], 0
+    games = games_query.order_by(*order).offset((page - 1) * per_page).limit(per_page).all()
+    return games, total
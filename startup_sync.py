@@ -0,0 +1,83 @@
+import os
+import time
+import threading
+
+from utils import games_repo_lock, sync_games_from_folder_locked, warm_content_cache
+
+# --- 启动时的 games_repo 同步 ---
+# background: 服务先开始接受请求，同步在后台线程执行，/ready 在完成前返回 503；
+# blocking: 与旧行为一致，同步完成后才开始接受请求；off: 启动时不同步（由目录监听和手动刷新负责）
+STARTUP_SYNC_MODE = os.environ.get("FUNAI_STARTUP_SYNC", "background").lower()
+# 多个 uvicorn worker 通过 games_repo 同步文件锁只让一个进程扫描，其余进程等它完成后直接就绪
+
+class StartupSync:
+    def __init__(self, mode: str):
+        self.mode = mode
+        self._ready = threading.Event()
+
+        # 进度和统计信息
+        self.state = "pending"
+        self.processed = 0
+        self.total = 0
+        self.started_at = None
+        self.elapsed_ms = None
+        self.summary = None
+        self.error = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def _progress(self, processed: int, total: int):
+        self.processed, self.total = processed, total
+
+    def run(self):
+        """执行启动同步（阻塞，background 模式下由 lifespan 放到线程中调用）"""
+        started = time.perf_counter()
+        self.started_at = time.time()
+        try:
+            if self.mode == "off":
+                self.state = "skipped"
+            else:
+                self._sync()
+            # /content 缓存属于本进程，每个 worker 都要预热
+            warm_content_cache()
+        except Exception as e:
+            # 同步失败时仍然就绪，继续使用数据库中已有的游戏
+            self.state = "failed"
+            self.error = str(e)
+            print(f"⚠️ 启动同步失败: {e}")
+        finally:
+            self.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+            self._ready.set()
+
+    def _sync(self):
+        with games_repo_lock(wait=False) as acquired:
+            if acquired:
+                self.state = "running"
+                self.summary = sync_games_from_folder_locked(progress=self._progress)
+                self.state = "done"
+                return
+        # 其它 worker 正在扫描：等它释放锁，扫描结果已经写入数据库
+        self.state = "waiting"
+        print("⏳ 其它进程正在同步 games_repo，等待完成")
+        with games_repo_lock():
+            self.state = "scanned_by_other_worker"
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "ready": self.ready,
+            "state": self.state,
+            "processed": self.processed,
+            "total": self.total,
+            "started_at": self.started_at,
+            "elapsed_ms": self.elapsed_ms,
+            "summary": self.summary,
+            "error": self.error,
+        }
+
+startup_sync = StartupSync(STARTUP_SYNC_MODE)
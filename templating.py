@@ -0,0 +1,36 @@
+import os
+import time
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+# --- 共享模板环境 ---
+# 所有路由共用一个 Jinja2 环境：模板只解析编译一次，编译结果写入磁盘字节码缓存，重启后直接加载。
+# 生产环境（FUNAI_ENV=production）默认关闭模板自动重载，并在启动时预编译全部模板，语法错误直接阻止启动。
+FUNAI_ENV = os.environ.get("FUNAI_ENV", "development")
+TEMPLATE_DIR = os.environ.get("FUNAI_TEMPLATE_DIR", "templates")
+TEMPLATE_CACHE_DIR = os.environ.get("FUNAI_TEMPLATE_CACHE_DIR", os.path.join(".build_cache", "templates"))
+TEMPLATE_AUTO_RELOAD = os.environ.get("FUNAI_TEMPLATE_AUTO_RELOAD", "0" if FUNAI_ENV == "production" else "1") == "1"
+TEMPLATE_PRECOMPILE = os.environ.get("FUNAI_TEMPLATE_PRECOMPILE", "1" if FUNAI_ENV == "production" else "0") == "1"
+
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+
+environment = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    auto_reload=TEMPLATE_AUTO_RELOAD,
+    bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+    # 默认只缓存 400 个模板对象，这里保证全部模板常驻内存
+    cache_size=-1,
+)
+
+templates = Jinja2Templates(env=environment)
+
+def precompile_templates() -> dict:
+    """加载全部模板（同时写入字节码缓存），任一模板有语法错误时抛出 TemplateSyntaxError"""
+    started = time.perf_counter()
+    names = environment.list_templates(extensions=["html"])
+    for name in names:
+        environment.get_template(name)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    print(f"🧩 已预编译 {len(names)} 个模板: {elapsed_ms}ms")
+    return {"templates": len(names), "elapsed_ms": elapsed_ms}
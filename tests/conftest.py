@@ -0,0 +1,21 @@
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 测试直接导入项目根目录下的模块
+sys.path.insert(0, PROJECT_ROOT)
+
+# 在导入 database 等模块之前切换到临时工作目录：数据库、games_repo、uploads 和构建缓存都写在这里，
+# 不会改动项目中的 games.db；启动同步和目录监听关闭，由测试自己触发
+WORKDIR = tempfile.mkdtemp(prefix="funai_tests_")
+atexit.register(shutil.rmtree, WORKDIR, ignore_errors=True)
+os.makedirs(os.path.join(WORKDIR, "games_repo"))
+os.chdir(WORKDIR)
+os.environ.setdefault("FUNAI_DATABASE_URL", f"sqlite:///{os.path.join(WORKDIR, 'games.db')}")
+os.environ.setdefault("FUNAI_TEMPLATE_DIR", os.path.join(PROJECT_ROOT, "templates"))
+os.environ.setdefault("FUNAI_STARTUP_SYNC", "off")
+os.environ.setdefault("FUNAI_GAMES_WATCHER", "off")
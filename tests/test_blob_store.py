@@ -0,0 +1,114 @@
+import os
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal, Game, GameBlob
+from blob_store import hash_content, read_blob
+from utils import sync_games_from_folder
+
+client = TestClient(main.app)
+
+def unique_html() -> str:
+    return f"<html><head><title>blob</title></head><body>{uuid.uuid4().hex}</body></html>"
+
+def upload(html_code: str) -> int:
+    response = client.post("/upload", data=dict(
+        title="blob", author="a", ai_model="m", description="d", prompt="p",
+        html_code=html_code, edit_password="secret",
+    ), follow_redirects=False)
+    assert response.status_code == 303
+    return int(response.headers["location"].rsplit("/", 1)[1])
+
+def edit(game_id: int, html_code: str):
+    response = client.post(f"/edit/{game_id}", data=dict(
+        title="blob", author="a", ai_model="m", description="d", prompt="p",
+        html_code=html_code, edit_password="secret",
+    ), follow_redirects=False)
+    assert response.status_code == 303
+
+def delete(game_id: int):
+    client.cookies.set("admin_key", "admin123")
+    response = client.post(f"/admin/delete/{game_id}", follow_redirects=False)
+    assert response.status_code == 303
+
+def blob_exists(content_hash: str) -> bool:
+    db = SessionLocal()
+    try:
+        return db.get(GameBlob, content_hash) is not None
+    finally:
+        db.close()
+
+def game_hash(game_id: int) -> str:
+    db = SessionLocal()
+    try:
+        return db.get(Game, game_id).content_hash
+    finally:
+        db.close()
+
+def test_identical_uploads_share_one_blob():
+    html = unique_html()
+    first, second = upload(html), upload(html)
+    content_hash = hash_content(html)
+
+    assert game_hash(first) == game_hash(second) == content_hash
+    db = SessionLocal()
+    try:
+        assert db.query(GameBlob).filter(GameBlob.hash == content_hash).count() == 1
+        assert db.get(Game, first).html_code is None
+    finally:
+        db.close()
+    assert client.get(f"/content/{second}").text == html
+
+def test_edit_releases_blob_only_when_unreferenced():
+    html = unique_html()
+    first, second = upload(html), upload(html)
+    old_hash = hash_content(html)
+
+    edit(first, unique_html())
+    # 另一个游戏仍在使用旧内容
+    assert blob_exists(old_hash)
+
+    edited = unique_html()
+    edit(second, edited)
+    assert not blob_exists(old_hash)
+    assert game_hash(second) == hash_content(edited)
+    assert client.get(f"/content/{second}").text == edited
+
+def test_delete_keeps_shared_blob():
+    html = unique_html()
+    first, second = upload(html), upload(html)
+    content_hash = hash_content(html)
+
+    delete(first)
+    assert blob_exists(content_hash)
+    assert client.get(f"/content/{second}").text == html
+
+    delete(second)
+    assert not blob_exists(content_hash)
+
+def test_sync_replaces_and_releases_blob():
+    filename = f"sync_{uuid.uuid4().hex[:8]}.html"
+    path = os.path.join("games_repo", filename)
+    original, changed = unique_html(), unique_html()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(original)
+    assert sync_games_from_folder([filename])["added"] == 1
+    assert blob_exists(hash_content(original))
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(changed)
+    # 保证 mtime 变化，清单不会把文件当成未修改
+    later = time.time() + 10
+    os.utime(path, (later, later))
+    assert sync_games_from_folder([filename])["updated"] == 1
+
+    assert not blob_exists(hash_content(original))
+    db = SessionLocal()
+    try:
+        game = db.query(Game).filter(Game.filename == filename).one()
+        assert read_blob(db, game.content_hash) == changed
+    finally:
+        db.close()
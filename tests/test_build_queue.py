@@ -0,0 +1,55 @@
+import io
+import os
+import time
+import zipfile
+
+import pytest
+
+import build_queue as build_queue_module
+from build_queue import BuildQueue
+from npm_cache import npm_cache
+
+def make_archive(entries):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+    archive.seek(0)
+    return archive
+
+@pytest.fixture
+def slow_builds(monkeypatch):
+    # 构建进程只是长时间 sleep，并且不走依赖缓存
+    monkeypatch.setattr(build_queue_module, "BUILD_RUNNER", "import time\ntime.sleep(60)\n")
+    monkeypatch.setattr(npm_cache, "restore", lambda cache_key, directory: False)
+
+def wait_for(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.05)
+
+def test_shutdown_kills_running_build_and_cancels_queued_jobs(tmp_path, slow_builds):
+    queue = BuildQueue(workers=1, timeout=600, max_disk_bytes=1024 * 1024 * 1024, retention=3600)
+    fields = dict(title="t", author="a", ai_model="m", description="d", prompt="p", category_id=1)
+    running_archive = make_archive({"package.json": "{}", "index.html": "<html></html>"})
+    queued_archive = make_archive({"index.html": "<html></html>"})
+    running = queue.submit(str(tmp_path / "running"), running_archive, fields)
+    queued = queue.submit(str(tmp_path / "queued"), queued_archive, fields)
+    os.makedirs(queued.upload_dir)
+
+    wait_for(lambda: running.process is not None)
+    process = running.process
+    started = time.time()
+    queue.shutdown(timeout=5)
+
+    assert time.time() - started < 5
+    # 运行中的构建进程组被终止，任务失败并清理目录
+    assert process.returncode is not None
+    assert running.status == "failed"
+    assert not os.path.exists(running.upload_dir)
+    # 排队中的任务标记为失败，目录和上传的 ZIP 都被清理
+    assert queued.status == "failed"
+    assert queued.finished_at is not None
+    assert queued_archive.closed
+    assert not os.path.exists(queued.upload_dir)
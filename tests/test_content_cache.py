@@ -0,0 +1,38 @@
+"""ContentCache 测试：失效计数阻止加载期间被失效的旧内容写回"""
+import time
+
+from content_cache import ContentCache
+
+def test_put_after_invalidate_is_not_cached():
+    cache = ContentCache(max_bytes=1024, ttl=60)
+    # 未命中的请求在读库前取得计数
+    generation = cache.generation(1)
+    # 读库期间游戏被编辑
+    cache.invalidate(1)
+    body = cache.put(1, "<p>old</p>", generation)
+    assert body == b"<p>old</p>"
+    assert cache.get(1) is None
+    assert cache.stats()["stale_puts"] == 1
+
+def test_put_after_clear_is_not_cached():
+    cache = ContentCache(max_bytes=1024, ttl=60)
+    generation = cache.generation(1)
+    cache.clear()
+    cache.put(1, "<p>old</p>", generation)
+    assert cache.get(1) is None
+
+def test_put_with_current_generation_is_cached():
+    cache = ContentCache(max_bytes=1024, ttl=60)
+    cache.invalidate(1)
+    generation = cache.generation(1)
+    cache.put(1, "<p>new</p>", generation)
+    # 其它游戏的失效不影响
+    cache.invalidate(2)
+    assert cache.get(1) == b"<p>new</p>"
+
+def test_entries_expire():
+    cache = ContentCache(max_bytes=1024, ttl=0.1)
+    cache.put(1, "<p>x</p>")
+    time.sleep(0.15)
+    assert cache.get(1) is None
+    assert cache.stats()["bytes"] == 0
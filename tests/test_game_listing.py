@@ -0,0 +1,69 @@
+import uuid
+import random
+
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal, Game, read_category_counts
+
+client = TestClient(main.app)
+
+def new_category_id() -> int:
+    return random.randint(100000, 999999)
+
+def create_games(category_id: int, views: list) -> list:
+    db = SessionLocal()
+    try:
+        games = [Game(title="listing", author="a", ai_model="m", description="d", prompt="p", html_code="",
+                      filename=f"listing_{uuid.uuid4().hex}.html", category_id=category_id, views=count)
+                 for count in views]
+        db.add_all(games)
+        db.commit()
+        return [game.id for game in games]
+    finally:
+        db.close()
+
+def category_count(category_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return read_category_counts(db).get(category_id, 0)
+    finally:
+        db.close()
+
+def test_cursor_pages_are_continuous_with_tied_views():
+    category_id = new_category_id()
+    # 大量浏览量相同的游戏跨越多页，游标按 (views, id) 定位，不重复也不遗漏
+    views = [7] * 20 + [3] * 15 + [9, 1]
+    ids = create_games(category_id, views)
+    expected = [game_id for _, game_id in sorted(zip(views, ids), reverse=True)]
+
+    seen, cursor = [], ""
+    while cursor is not None:
+        response = client.get("/api/games", params={"category_id": category_id, "cursor": cursor})
+        assert response.status_code == 200
+        body = response.json()
+        seen += [game["id"] for game in body["games"]]
+        cursor = body["next_cursor"]
+    assert seen == expected
+
+def test_invalid_cursor_is_400():
+    for cursor in ("abc", "1_x", "1_2_3", "_"):
+        response = client.get("/api/games", params={"category_id": 1, "cursor": cursor})
+        assert response.status_code == 400
+
+def test_category_counts_follow_insert_delete_and_move():
+    source, target = new_category_id(), new_category_id()
+    first, second = create_games(source, [0, 0])
+    assert category_count(source) == 2
+
+    db = SessionLocal()
+    try:
+        db.get(Game, first).category_id = target
+        db.commit()
+        assert (category_count(source), category_count(target)) == (1, 1)
+
+        db.delete(db.get(Game, second))
+        db.commit()
+        assert (category_count(source), category_count(target)) == (0, 1)
+    finally:
+        db.close()
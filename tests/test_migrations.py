@@ -0,0 +1,45 @@
+from sqlalchemy import text
+
+from database import engine, upgrade_schema, DATA_MIGRATIONS
+
+def scalar(sql: str, **params):
+    with engine.connect() as conn:
+        return conn.execute(text(sql), params).scalar()
+
+def execute(sql: str, **params):
+    with engine.begin() as conn:
+        conn.execute(text(sql), params)
+
+def test_data_migrations_run_once():
+    assert scalar("PRAGMA user_version") == len(DATA_MIGRATIONS)
+
+    # 评分记录没有对应的按天汇总行：已迁移的数据库重新启动时不再回填
+    execute("INSERT INTO rating_events (game_id, client_id, rating, created_at) "
+            "VALUES (987654, 'migration-test', 4, datetime('now'))")
+    upgrade_schema()
+    assert scalar("SELECT COUNT(*) FROM game_daily_stats WHERE game_id = 987654") == 0
+
+    # 旧版本数据库（user_version = 0）升级时执行一次回填
+    execute("PRAGMA user_version = 0")
+    upgrade_schema()
+    assert scalar("PRAGMA user_version") == len(DATA_MIGRATIONS)
+    assert scalar("SELECT rating_sum FROM game_daily_stats WHERE game_id = 987654") == 4
+
+def test_likes_dedupe_and_counter_seed_run_once():
+    # 模拟升级前的数据库：没有唯一索引、存在重复点赞、还没有计数行
+    execute("DROP INDEX uq_likes_ip_address")
+    execute("DELETE FROM counters WHERE name = 'likes'")
+    for ip_address in ("10.0.0.1", "10.0.0.1", "10.0.0.2"):
+        execute("INSERT INTO likes (ip_address) VALUES (:ip)", ip=ip_address)
+    execute("PRAGMA user_version = 1")
+
+    upgrade_schema()
+    likes = scalar("SELECT COUNT(*) FROM likes")
+    assert scalar("SELECT COUNT(*) FROM likes WHERE ip_address = '10.0.0.1'") == 1
+    assert scalar("SELECT value FROM counters WHERE name = 'likes'") == likes
+
+    # 再次启动不重新统计：计数只由触发器维护
+    execute("UPDATE counters SET value = value + 100 WHERE name = 'likes'")
+    upgrade_schema()
+    assert scalar("SELECT value FROM counters WHERE name = 'likes'") == likes + 100
+    execute("UPDATE counters SET value = value - 100 WHERE name = 'likes'")
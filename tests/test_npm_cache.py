@@ -0,0 +1,50 @@
+import os
+import shutil
+import threading
+
+from npm_cache import NpmDependencyCache
+
+def make_project(path, dependencies='{"dependencies": {"left-pad": "1.3.0"}}'):
+    os.makedirs(path)
+    with open(os.path.join(path, "package.json"), "w") as f:
+        f.write(dependencies)
+    return str(path)
+
+def test_evict_skips_entry_being_restored(tmp_path, monkeypatch):
+    cache = NpmDependencyCache(str(tmp_path / "cache"), max_bytes=1024 * 1024, max_age_days=14)
+    built = make_project(tmp_path / "built")
+    os.makedirs(os.path.join(built, "node_modules", "left-pad"))
+    with open(os.path.join(built, "node_modules", "left-pad", "index.js"), "w") as f:
+        f.write("module.exports = 1")
+    key = cache.cache_key(built)
+    cache.store(key, built, build_seconds=30)
+
+    # 复制进行到一半时暂停，期间触发淘汰
+    copying, resume = threading.Event(), threading.Event()
+    copytree = shutil.copytree
+
+    def slow_copytree(*args, **kwargs):
+        copying.set()
+        resume.wait(5)
+        return copytree(*args, **kwargs)
+
+    monkeypatch.setattr(shutil, "copytree", slow_copytree)
+    project = make_project(tmp_path / "project")
+    result = []
+    restorer = threading.Thread(target=lambda: result.append(cache.restore(key, project)))
+    restorer.start()
+    assert copying.wait(5)
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert os.path.isdir(os.path.join(cache.cache_dir, key, "node_modules"))
+
+    resume.set()
+    restorer.join(5)
+    assert result == [True]
+    assert os.path.exists(os.path.join(project, "node_modules", "left-pad", "index.js"))
+
+    # 复制结束后条目可以被正常淘汰
+    cache.evict()
+    assert not os.path.exists(os.path.join(cache.cache_dir, key))
+    assert cache.stats()["evictions"] == 1
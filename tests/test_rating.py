@@ -0,0 +1,49 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal, Game, RatingEvent
+
+client = TestClient(main.app)
+
+def create_game() -> int:
+    db = SessionLocal()
+    try:
+        game = Game(title="rating", author="a", ai_model="m", description="d", prompt="p", category_id=1,
+                    filename=f"rating_{uuid.uuid4().hex}.html", html_code="")
+        db.add(game)
+        db.commit()
+        return game.id
+    finally:
+        db.close()
+
+def test_rating_first_repeat_and_unknown_game():
+    game_id = create_game()
+
+    response = client.post(f"/rate/{game_id}", json={"rating": 4})
+    assert response.status_code == 200
+    assert response.json() == {"rating": 4.0, "rating_count": 1}
+
+    # 同一客户端重复评分被拒绝，游戏评分不变
+    assert client.post(f"/rate/{game_id}", json={"rating": 1}).status_code == 409
+    db = SessionLocal()
+    try:
+        game = db.get(Game, game_id)
+        assert (game.rating_total, game.rating_count) == (4, 1)
+    finally:
+        db.close()
+
+    assert client.post("/rate/999999", json={"rating": 5}).status_code == 404
+
+def test_rating_deleted_game_with_leftover_events_is_404():
+    game_id = create_game()
+    assert client.post(f"/rate/{game_id}", json={"rating": 5}).status_code == 200
+    db = SessionLocal()
+    try:
+        db.delete(db.get(Game, game_id))
+        db.commit()
+        assert db.query(RatingEvent).filter(RatingEvent.game_id == game_id).count() == 1
+    finally:
+        db.close()
+    assert client.post(f"/rate/{game_id}", json={"rating": 5}).status_code == 404
@@ -0,0 +1,57 @@
+import os
+import uuid
+
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal, Game
+from routers.repo import GAMES_REPO_DIR
+
+def create_multi_file_game(directory_name: str) -> int:
+    game_dir = os.path.join(GAMES_REPO_DIR, directory_name)
+    os.makedirs(game_dir)
+    with open(os.path.join(game_dir, "index.html"), "w") as f:
+        f.write("<html></html>")
+    with open(os.path.join(game_dir, "a.js"), "w") as f:
+        f.write("console.log(1)")
+    db = SessionLocal()
+    try:
+        game = Game(title="repo", author="a", ai_model="m", description="d", prompt="p", category_id=1,
+                    filename="", html_code="", is_multi_file=1, directory_name=directory_name)
+        db.add(game)
+        db.commit()
+        return game.id
+    finally:
+        db.close()
+
+def test_head_and_delete_invalidates_committed_directory():
+    directory_name = uuid.uuid4().hex[:8]
+    game_id = create_multi_file_game(directory_name)
+    client = TestClient(main.app)
+
+    response = client.get(f"/repo/{directory_name}/a.js")
+    assert response.status_code == 200
+    assert response.content == b"console.log(1)"
+
+    # HEAD 与 GET 共用处理函数，只返回响应头
+    response = client.head(f"/repo/{directory_name}/a.js")
+    assert response.status_code == 200
+    assert response.headers["content-length"] == "14"
+    assert response.headers["etag"]
+    assert response.content == b""
+
+    client.cookies.set("admin_key", "admin123")
+    response = client.post(f"/admin/delete/{game_id}", follow_redirects=False)
+    assert response.status_code == 303
+
+    # 已删除游戏的目录不再作为已提交目录对外提供，即使仍在缓存有效期内
+    assert client.get(f"/repo/{directory_name}/a.js").status_code == 404
+    assert client.head(f"/repo/{directory_name}/a.js").status_code == 404
+
+def test_uncommitted_directory_is_not_served():
+    directory_name = uuid.uuid4().hex[:8]
+    os.makedirs(os.path.join(GAMES_REPO_DIR, directory_name))
+    with open(os.path.join(GAMES_REPO_DIR, directory_name, "index.html"), "w") as f:
+        f.write("<html></html>")
+    client = TestClient(main.app)
+    assert client.get(f"/repo/{directory_name}/index.html").status_code == 404
@@ -0,0 +1,55 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal, Game
+
+client = TestClient(main.app)
+
+def create_game(**fields) -> int:
+    values = dict(author="a", ai_model="m", description="d", prompt="p", category_id=1, html_code="")
+    values.update(fields)
+    values.setdefault("filename", f"search_{uuid.uuid4().hex}.html")
+    db = SessionLocal()
+    try:
+        game = Game(**values)
+        db.add(game)
+        db.commit()
+        return game.id
+    finally:
+        db.close()
+
+def search_ids(query: str) -> list:
+    response = client.get("/api/search", params={"q": query})
+    assert response.status_code == 200
+    return [game["id"] for game in response.json()["games"]]
+
+def test_fts_match_ranks_title_first():
+    token = uuid.uuid4().hex[:10]
+    in_prompt = create_game(title="other", prompt=f"prompt {token}")
+    in_title = create_game(title=f"太空{token}射击")
+    # trigram 索引可以匹配中文和词内子串
+    assert search_ids(token[2:8]) == [in_title, in_prompt]
+    assert search_ids(f"太空{token[:4]}") == [in_title]
+
+def test_short_terms_fall_back_to_like():
+    token = uuid.uuid4().hex[:10]
+    game_id = create_game(title=f"{token} 贪吃蛇")
+    assert search_ids("贪吃") and game_id in search_ids("贪吃")
+    # 长短检索词混用：FTS 命中后再按短词过滤
+    assert search_ids(f"{token} 吃蛇") == [game_id]
+    assert search_ids(f"{token} 俄罗") == []
+
+def test_quotes_and_like_wildcards_are_escaped():
+    token = uuid.uuid4().hex[:10]
+    quoted = create_game(title=f'say "{token}" now')
+    percent = create_game(title=f"{token} 5%")
+    plain = create_game(title=f"{token} 50")
+
+    # 引号不会破坏 FTS 查询语法
+    assert search_ids(f'"{token}"') == [quoted]
+    assert client.get("/api/search", params={"q": 'a"b"c OR NOT'}).status_code == 200
+    # % 和 _ 按字面匹配，不作为 LIKE 通配符
+    assert search_ids(f"{token} 5%") == [percent]
+    assert plain not in search_ids(f"{token} 5_")
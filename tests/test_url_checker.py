@@ -0,0 +1,130 @@
+"""UrlChecker 测试：在 127.0.0.1 上启动一个 http.server 作为被检查的站点"""
+import time
+import socket
+import asyncio
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from url_checker import UrlChecker
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # /ok 200，/missing 404，/no-head 对 HEAD 返回 405、GET 返回 200，/slow 延迟后返回 200
+    requests = Counter()
+
+    def _respond(self, method: str):
+        self.requests[(method, self.path)] += 1
+        if self.path == "/slow":
+            time.sleep(0.2)
+        if self.path in ("/ok", "/slow"):
+            status = 200
+        elif self.path == "/no-head":
+            status = 405 if method == "HEAD" else 200
+        else:
+            status = 404
+        body = b"stand-in" if method == "GET" else b""
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._respond("HEAD")
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture(autouse=True)
+def reset_requests():
+    StandInHandler.requests.clear()
+
+def make_checker(cache_ttl: float = 60, negative_ttl: float = 60) -> UrlChecker:
+    return UrlChecker(timeout=2, max_connections=10, per_host=2, cache_ttl=cache_ttl, negative_ttl=negative_ttl)
+
+def run(checker: UrlChecker, coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await checker.close()
+    return asyncio.run(main())
+
+def refused_url() -> str:
+    # 绑定后立即关闭，得到一个没有进程监听的端口
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+def test_reachable_and_missing(server):
+    checker = make_checker()
+    assert run(checker, checker.check(f"{server}/ok")) is True
+    checker = make_checker()
+    assert run(checker, checker.check(f"{server}/missing")) is False
+
+def test_head_405_falls_back_to_get(server):
+    checker = make_checker()
+    assert run(checker, checker.check(f"{server}/no-head")) is True
+    assert StandInHandler.requests[("HEAD", "/no-head")] == 1
+    assert StandInHandler.requests[("GET", "/no-head")] == 1
+
+def test_refused_host_is_cached_as_unreachable():
+    base = refused_url()
+    checker = make_checker()
+    probes = []
+    original_probe = checker._probe
+
+    async def counting_probe(url):
+        probes.append(url)
+        return await original_probe(url)
+    checker._probe = counting_probe
+
+    async def scenario():
+        first = await checker.check(f"{base}/a")
+        second = await checker.check(f"{base}/b")
+        return first, second
+
+    assert run(checker, scenario()) == (False, False)
+    # 第二个链接命中不可达主机缓存，没有再发请求
+    assert probes == [f"{base}/a"]
+    assert checker.unreachable_hosts.stats()["hits"] == 1
+
+def test_positive_and_negative_results_expire(server):
+    checker = make_checker(cache_ttl=0.3, negative_ttl=0.3)
+
+    async def scenario():
+        for _ in range(2):
+            assert await checker.check(f"{server}/ok") is True
+            assert await checker.check(f"{server}/missing") is False
+        await asyncio.sleep(0.4)
+        assert await checker.check(f"{server}/ok") is True
+        assert await checker.check(f"{server}/missing") is False
+
+    run(checker, scenario())
+    assert StandInHandler.requests[("HEAD", "/ok")] == 2
+    assert StandInHandler.requests[("HEAD", "/missing")] == 2
+
+def test_concurrent_checks_share_one_request(server):
+    checker = make_checker()
+
+    async def scenario():
+        return await asyncio.gather(*(checker.check(f"{server}/slow") for _ in range(10)))
+
+    assert run(checker, scenario()) == [True] * 10
+    assert StandInHandler.requests[("HEAD", "/slow")] == 1
+    # 检查结束后不再保留该主机的信号量
+    assert checker.stats()["active_hosts"] == 0
@@ -0,0 +1,51 @@
+import uuid
+from datetime import datetime
+
+import view_counter as view_counter_module
+from view_counter import ViewCounter
+from database import SessionLocal, Game, GameDailyStat
+
+def create_game() -> int:
+    db = SessionLocal()
+    try:
+        game = Game(title="views", author="a", ai_model="m", description="d", prompt="p", category_id=1,
+                    filename=f"views_{uuid.uuid4().hex}.html", html_code="")
+        db.add(game)
+        db.commit()
+        return game.id
+    finally:
+        db.close()
+
+def read_views(game_id: int) -> tuple:
+    db = SessionLocal()
+    try:
+        daily = db.query(GameDailyStat.views).filter(
+            GameDailyStat.game_id == game_id, GameDailyStat.day == datetime.utcnow().date()
+        ).scalar()
+        return db.get(Game, game_id).views, daily or 0
+    finally:
+        db.close()
+
+def test_failed_flush_requeues_and_daily_stats_match(monkeypatch):
+    game_id = create_game()
+    counter = ViewCounter(flush_interval=60, max_pending=1000)
+    for _ in range(3):
+        counter.incr(game_id)
+
+    # 汇总写入失败时整个事务回滚，games.views 也不增加，增量放回缓冲区
+    record_daily_stats = view_counter_module.record_daily_stats
+
+    def failing(conn, rows):
+        raise RuntimeError("disk I/O error")
+
+    monkeypatch.setattr(view_counter_module, "record_daily_stats", failing)
+    assert counter.flush() == 0
+    assert read_views(game_id) == (0, 0)
+    stats = counter.stats()
+    assert (stats["pending_views"], stats["failed_flushes"]) == (3, 1)
+
+    counter.incr(game_id, 2)
+    monkeypatch.setattr(view_counter_module, "record_daily_stats", record_daily_stats)
+    assert counter.flush() == 5
+    assert read_views(game_id) == (5, 5)
+    assert counter.stats()["pending_views"] == 0
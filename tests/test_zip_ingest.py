@@ -0,0 +1,108 @@
+import os
+import zipfile
+import tempfile
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+import zip_ingest
+from zip_ingest import (
+    ZipLimitError, UploadSizeLimitMiddleware, detach_upload, inspect_zip, safe_extract_zip,
+)
+
+def make_zip(path, entries, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(path, "w", compression) as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+    return path
+
+def test_detach_upload_keeps_spooled_file_after_close(tmp_path):
+    path = make_zip(tmp_path / "ok.zip", {"index.html": "<html></html>"})
+    source = tempfile.SpooledTemporaryFile(max_size=16)
+    source.write(path.read_bytes())
+    archive = detach_upload(source, max_bytes=1024 * 1024)
+    # 请求结束时 UploadFile 被关闭，接管的文件仍然可读
+    source.close()
+    assert [info.filename for info in inspect_zip(archive)] == ["index.html"]
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    safe_extract_zip(archive, str(dest))
+    archive.close()
+    assert (dest / "index.html").read_text() == "<html></html>"
+
+def test_detach_upload_rejects_oversized_file():
+    source = tempfile.SpooledTemporaryFile()
+    source.write(b"x" * 2048)
+    with pytest.raises(ZipLimitError):
+        detach_upload(source, max_bytes=1024)
+
+def test_inspect_zip_rejects_too_many_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(zip_ingest, "ZIP_MAX_ENTRIES", 3)
+    path = make_zip(tmp_path / "many.zip", {f"f{i}.txt": "x" for i in range(4)})
+    with pytest.raises(ZipLimitError, match="条目数量"):
+        inspect_zip(str(path))
+
+def test_inspect_zip_rejects_high_compression_ratio(tmp_path):
+    path = make_zip(tmp_path / "bomb.zip", {"zeros.bin": b"\0" * (4 * 1024 * 1024)})
+    with pytest.raises(ZipLimitError, match="压缩比"):
+        inspect_zip(str(path))
+
+def test_safe_extract_zip_rejects_path_traversal(tmp_path):
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    path = make_zip(tmp_path / "evil.zip", {"index.html": "<html></html>", "../evil.txt": "pwned"})
+    with pytest.raises(ZipLimitError, match="路径不安全"):
+        safe_extract_zip(str(path), str(dest))
+    assert not (tmp_path / "evil.txt").exists()
+
+def test_safe_extract_zip_enforces_uncompressed_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(zip_ingest, "ZIP_MAX_UNCOMPRESSED_BYTES", 1000)
+    dest = tmp_path / "dest"
+    path = make_zip(tmp_path / "big.zip", {"a.txt": os.urandom(600), "b.txt": os.urandom(600)}, zipfile.ZIP_STORED)
+    with pytest.raises(ZipLimitError, match="解压后大小"):
+        safe_extract_zip(str(path), str(dest))
+
+def test_safe_extract_zip_extracts_valid_archive(tmp_path):
+    dest = tmp_path / "dest"
+    path = make_zip(tmp_path / "ok.zip", {"index.html": "<html></html>", "js/a.js": "console.log(1)"})
+    assert safe_extract_zip(str(path), str(dest)) == len("<html></html>") + len("console.log(1)")
+    assert (dest / "js" / "a.js").read_text() == "console.log(1)"
+
+def make_upload_app(max_bytes):
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_bytes=max_bytes)
+    handled = []
+
+    @app.post("/upload")
+    def upload(zip_file: UploadFile = File(...)):
+        handled.append(zip_file.filename)
+        return {"size": len(zip_file.file.read())}
+
+    return app, handled
+
+def test_upload_size_limit_rejects_on_content_length():
+    app, handled = make_upload_app(max_bytes=1024)
+    with TestClient(app) as client:
+        response = client.post("/upload", files={"zip_file": ("g.zip", b"x" * 4096, "application/zip")})
+        assert response.status_code == 413
+        assert handled == []
+
+        response = client.post("/upload", files={"zip_file": ("g.zip", b"x" * 100, "application/zip")})
+        assert response.status_code == 200
+        assert response.json() == {"size": 100}
+
+def test_upload_size_limit_caps_streamed_body():
+    app, handled = make_upload_app(max_bytes=1024)
+    body = (b"--b\r\nContent-Disposition: form-data; name=\"zip_file\"; filename=\"g.zip\"\r\n\r\n"
+            + b"x" * 4096 + b"\r\n--b--\r\n")
+
+    def chunks():
+        for i in range(0, len(body), 256):
+            yield body[i:i + 256]
+
+    with TestClient(app) as client:
+        # 没有 Content-Length 的分块请求体，在读取过程中超限即被拒绝
+        response = client.post("/upload", content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=b"})
+        assert response.status_code == 413
+        assert handled == []
@@ -0,0 +1,75 @@
+"""并发吞吐量基准：对运行中的服务并发发起请求，统计吞吐量和延迟分位数
+
+用法（在项目根目录）：
+    uvicorn main:app --port 8000 &
+    python -m tools.bench_concurrency --url http://127.0.0.1:8000 --concurrency 50 --requests 2000
+
+对比改动前后时，分别在两个版本上启动服务并用相同参数运行。
+需要 httpx（pip install httpx）。
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+import httpx
+
+DEFAULT_PATHS = ["/", "/api/games", "/api/games?page=2", "/leaderboard", "/play/1", "/about", "/ai_navigation"]
+
+async def run(url: str, paths: list, concurrency: int, total: int, timeout: float) -> dict:
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        async def worker():
+            nonlocal next_index, errors
+            while next_index < total:
+                path = paths[next_index % len(paths)]
+                next_index += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "p50_ms": round(percentile(0.50), 1),
+        "p95_ms": round(percentile(0.95), 1),
+        "p99_ms": round(percentile(0.99), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="并发吞吐量基准")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--path", action="append", help="要压测的路径，可重复指定；默认混合首页、列表、排行榜等")
+    args = parser.parse_args()
+
+    paths = args.path or DEFAULT_PATHS
+    result = asyncio.run(run(args.url, paths, args.concurrency, args.requests, args.timeout))
+    print(f"目标: {args.url}  并发: {args.concurrency}  路径: {', '.join(paths)}")
+    for key, value in result.items():
+        print(f"{key:<16}{value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""全文检索基准：在临时数据库中生成大量游戏，统计 /api/search 所用检索函数的延迟
+
+用法（在项目根目录）：
+    python -m tools.bench_search --games 100000 --repeat 50
+
+临时数据库写在 --db 指定的路径（默认系统临时目录），不会修改 games.db。
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+WORDS_ZH = ["太阳系", "万有引力", "推箱子", "打飞机", "愤怒的小鸟", "摩擦力", "演示", "动画", "物理", "迷宫",
+            "赛车", "篮球", "俄罗斯方块", "贪吃蛇", "扫雷", "五子棋", "射击", "跑酷", "塔防", "音乐"]
+WORDS_EN = ["solar", "gravity", "puzzle", "shooter", "racing", "physics", "snake", "tetris", "maze", "arcade",
+            "platformer", "space", "tower", "defense", "rhythm", "chess", "demo", "simulation", "canvas", "retro"]
+MODELS = ["Gemini Pro", "ChatGPT", "DeepSeek-V3", "豆包", "Claude", "Qwen"]
+AUTHORS = ["哈哈", "edgar", "匿名玩家", "alice", "bob", "小明"]
+
+QUERIES = ["万有引力", "打飞机", "gravity", "tetris", "摩擦力 演示", "solar system", "DeepSeek", "俄罗斯方块",
+           "物理", "ab"]  # 最后两个少于 3 个字符，走 LIKE 回退
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "tas", "vo", "zhi", "qu", "bel", "nor", "dex", "pa", "sun", "yo", "fen", "gri"]
+# 检索词在文本中出现的概率，其余为随机生成的填充词（控制命中数接近真实目录）
+KEYWORD_RATE = 0.02
+
+def filler_vocabulary(rng: random.Random, size: int = 5000) -> list:
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)]
+
+def sentence(rng: random.Random, vocabulary: list, count: int) -> str:
+    words = []
+    for _ in range(count):
+        if rng.random() < KEYWORD_RATE:
+            words.append(rng.choice(WORDS_ZH + WORDS_EN))
+        else:
+            words.append(rng.choice(vocabulary))
+    return " ".join(words)
+
+def populate(total: int, batch: int = 5000):
+    from sqlalchemy import insert
+    from database import engine, Game
+
+    rng = random.Random(42)
+    vocabulary = filler_vocabulary(rng)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, total, batch):
+            rows = [
+                {
+                    "title": sentence(rng, vocabulary, 2),
+                    "description": sentence(rng, vocabulary, 12),
+                    "author": rng.choice(AUTHORS),
+                    "ai_model": rng.choice(MODELS),
+                    "prompt": sentence(rng, vocabulary, 30),
+                    "html_code": "",
+                    "category_id": rng.randint(1, 4),
+                    "views": rng.randint(0, 10000),
+                }
+                for _ in range(min(batch, total - offset))
+            ]
+            conn.execute(insert(Game), rows)
+    return time.perf_counter() - started
+
+def bench(repeat: int) -> list:
+    from database import SessionLocal
+    from search import search_games
+
+    results = []
+    db = SessionLocal()
+    try:
+        for query in QUERIES:
+            for category_id in (None, 2):
+                latencies = []
+                total = 0
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    _, total = search_games(db, query, category_id)
+                    latencies.append(time.perf_counter() - started)
+                latencies.sort()
+                results.append({
+                    "query": query,
+                    "category_id": category_id,
+                    "matches": total,
+                    "p50_ms": round(statistics.median(latencies) * 1000, 2),
+                    "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+                })
+    finally:
+        db.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="全文检索基准")
+    parser.add_argument("--games", type=int, default=100000, help="生成的游戏数量")
+    parser.add_argument("--repeat", type=int, default=50, help="每个检索重复次数")
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "funai_bench_search.db"))
+    args = parser.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+    # 必须在导入 database 之前设置，使引擎指向临时数据库
+    os.environ["FUNAI_DATABASE_URL"] = f"sqlite:///{args.db}"
+
+    elapsed = populate(args.games)
+    print(f"📥 写入 {args.games} 个游戏（含 FTS 触发器）: {elapsed:.1f}s")
+
+    print(f"{'query':<16}{'category':>10}{'matches':>10}{'p50_ms':>10}{'p95_ms':>10}")
+    for row in bench(args.repeat):
+        print(f"{row['query']:<16}{str(row['category_id'] or '-'):>10}{row['matches']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""模板冷启动基准：在新进程中加载全部模板并渲染一次首页，对比有无字节码缓存的耗时
+
+用法（在项目根目录）：
+    python -m tools.bench_templates --repeat 5
+
+字节码缓存写在临时目录，不影响 .build_cache/templates。
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+# 子进程：只导入模板环境，计时加载全部模板，再渲染首页模板（首个请求的主要开销）
+CHILD = """
+import json, time
+from types import SimpleNamespace
+started = time.perf_counter()
+from templating import environment, precompile_templates
+imported = time.perf_counter()
+precompile_templates()
+compiled = time.perf_counter()
+environment.get_template("index.html").render(request=SimpleNamespace(url=SimpleNamespace(path="/")), games=[], categories=[],
+                                               selected_category=1, current_page=1, total_pages=1, next_cursor=None)
+rendered = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "compile_ms": (compiled - imported) * 1000,
+                  "first_render_ms": (rendered - compiled) * 1000}))
+"""
+
+def run_child(cache_dir: str) -> dict:
+    env = dict(os.environ, FUNAI_TEMPLATE_CACHE_DIR=cache_dir)
+    output = subprocess.run([sys.executable, "-c", CHILD], env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def summarize(samples: list) -> dict:
+    return {key: round(statistics.median(sample[key] for sample in samples), 2) for key in samples[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description="模板冷启动基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每种情况启动的进程数")
+    args = parser.parse_args()
+
+    cold, warm = [], []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # 空缓存：需要解析编译全部模板，并写入字节码缓存
+            cold.append(run_child(cache_dir))
+            # 缓存已存在：直接加载字节码
+            warm.append(run_child(cache_dir))
+
+    print(f"{'case':<16}{'import_ms':>12}{'compile_ms':>12}{'first_render_ms':>18}")
+    for name, samples in (("no cache", cold), ("bytecode cache", warm)):
+        row = summarize(samples)
+        print(f"{name:<16}{row['import_ms']:>12}{row['compile_ms']:>12}{row['first_render_ms']:>18}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""报告数据库连接实际生效的 SQLite PRAGMA，用于核对线上部署
+
+用法（在项目根目录）：python -m tools.check_sqlite_pragmas
+与当前配置档不一致时以非零状态码退出。
+"""
+import sys
+
+from sqlalchemy import text
+
+from database import engine, DB_PROFILE, SQLITE_PRAGMAS, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
+
+# PRAGMA 查询结果里以数字表示的枚举值
+ENUM_VALUES = {
+    "synchronous": {"0": "OFF", "1": "NORMAL", "2": "FULL", "3": "EXTRA"},
+    "temp_store": {"0": "DEFAULT", "1": "FILE", "2": "MEMORY"},
+}
+
+def normalize(name: str, value) -> str:
+    value = str(value)
+    return ENUM_VALUES.get(name, {}).get(value, value).upper()
+
+def main() -> int:
+    print(f"数据库: {engine.url}")
+    print(f"配置档: {DB_PROFILE}")
+    print(f"连接池: pool_size={DB_POOL_SIZE} max_overflow={DB_MAX_OVERFLOW} pool_timeout={DB_POOL_TIMEOUT}s")
+    print(f"SQLite 版本: {__import__('sqlite3').sqlite_version}")
+    print()
+
+    mismatches = 0
+    with engine.connect() as conn:
+        print(f"{'PRAGMA':<14}{'期望':<14}{'实际':<14}")
+        for name, expected in SQLITE_PRAGMAS.items():
+            actual = conn.execute(text(f"PRAGMA {name}")).scalar()
+            ok = normalize(name, actual) == normalize(name, expected)
+            mismatches += not ok
+            print(f"{name:<14}{expected:<14}{str(actual):<14}{'' if ok else '❌'}")
+
+    print()
+    if mismatches:
+        print(f"❌ {mismatches} 项 PRAGMA 与配置不一致")
+        return 1
+    print("✅ 所有 PRAGMA 均已生效")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
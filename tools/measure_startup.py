@@ -0,0 +1,84 @@
+"""启动耗时测量：在新进程中分段统计导入、建表、开始接受请求和 /ready 就绪的时间
+
+用法（在项目根目录）：
+    python -m tools.measure_startup --games 5000
+
+在临时目录中生成 --games 个 .html 游戏文件和一个空数据库，分别以 blocking 和 background
+两种启动同步模式各启动两次（首次为全量导入，第二次清单已存在，只做 stat），不会修改 games.db。
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程：工作目录为临时目录，项目代码从 PROJECT_ROOT 导入
+CHILD = """
+import sys, json, time
+started = time.perf_counter()
+import fastapi, sqlalchemy, jinja2
+libraries = time.perf_counter()
+import database
+schema = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    accepting = time.perf_counter()
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.01)
+    ready = time.perf_counter()
+    print(json.dumps({
+        "libraries_ms": (libraries - started) * 1000,
+        "create_all_ms": (schema - libraries) * 1000,
+        "app_import_ms": (imported - schema) * 1000,
+        "lifespan_ms": (accepting - imported) * 1000,
+        "accepting_ms": (accepting - started) * 1000,
+        "ready_ms": (ready - started) * 1000,
+    }))
+"""
+
+def make_workdir(games: int) -> str:
+    workdir = tempfile.mkdtemp(prefix="funai_startup_")
+    os.symlink(os.path.join(PROJECT_ROOT, "templates"), os.path.join(workdir, "templates"))
+    repo = os.path.join(workdir, "games_repo")
+    os.makedirs(repo)
+    for i in range(games):
+        with open(os.path.join(repo, f"game_{i}.html"), "w", encoding="utf-8") as f:
+            f.write(f"<html><head><title>Game {i}</title></head><body>{'<p>demo</p>' * 50}</body></html>")
+    return workdir
+
+def run_child(workdir: str, mode: str) -> dict:
+    env = dict(
+        os.environ,
+        PYTHONPATH=PROJECT_ROOT,
+        FUNAI_DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'games.db')}",
+        FUNAI_STARTUP_SYNC=mode,
+        FUNAI_GAMES_WATCHER="off",
+    )
+    output = subprocess.run([sys.executable, "-c", CHILD], cwd=workdir, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时测量")
+    parser.add_argument("--games", type=int, default=5000, help="games_repo 中生成的游戏文件数量")
+    args = parser.parse_args()
+
+    columns = ["libraries_ms", "create_all_ms", "app_import_ms", "lifespan_ms", "accepting_ms", "ready_ms"]
+    print(f"{'mode':<12}{'run':<7}" + "".join(f"{name:>15}" for name in columns))
+    for mode in ("blocking", "background"):
+        workdir = make_workdir(args.games)
+        try:
+            for run in ("cold", "warm"):
+                row = run_child(workdir, mode)
+                print(f"{mode:<12}{run:<7}" + "".join(f"{row[name]:>15.1f}" for name in columns))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
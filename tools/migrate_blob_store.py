@@ -0,0 +1,71 @@
+"""把 games.html_code 中的游戏代码迁移到内容寻址存储 game_blobs，并报告节省的空间
+
+用法（在项目根目录，建议先停止服务并备份 games.db）：
+    python -m tools.migrate_blob_store
+
+可重复执行：已迁移的游戏（content_hash 非空）会被跳过。默认迁移后执行 VACUUM
+以回收空闲页，--no-vacuum 跳过。
+"""
+import os
+import argparse
+
+from sqlalchemy import func
+
+from database import engine, SessionLocal, Game, GameBlob
+from blob_store import blob_fields
+
+def checkpoint():
+    # WAL 模式下 VACUUM 的结果先写入 -wal 文件，合并回主文件后再统计大小
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def database_size(path: str) -> int:
+    checkpoint()
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+
+def migrate(batch: int) -> dict:
+    result = {"games": 0, "html_bytes": 0}
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            rows = (db.query(Game.id, Game.html_code)
+                    .filter(Game.id > last_id, Game.content_hash.is_(None), Game.is_multi_file == 0)
+                    .order_by(Game.id).limit(batch).all())
+            if not rows:
+                break
+            for game_id, html_code in rows:
+                fields = blob_fields(db, html_code or "")
+                db.query(Game).filter(Game.id == game_id).update(fields, synchronize_session=False)
+                result["games"] += 1
+                result["html_bytes"] += fields["content_size"]
+            db.commit()
+            last_id = rows[-1].id
+
+        blobs, blob_bytes = db.query(func.count(GameBlob.hash), func.coalesce(func.sum(GameBlob.compressed_size), 0)).one()
+        result["blobs"], result["blob_bytes"] = blobs, blob_bytes
+    finally:
+        db.close()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="迁移游戏代码到 game_blobs")
+    parser.add_argument("--batch", type=int, default=200, help="每个事务迁移的游戏数量")
+    parser.add_argument("--no-vacuum", action="store_true", help="迁移后不执行 VACUUM")
+    args = parser.parse_args()
+
+    path = engine.url.database
+    before = database_size(path)
+    result = migrate(args.batch)
+    if not args.no_vacuum:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+    after = database_size(path)
+
+    print(f"📦 迁移游戏: {result['games']}，游戏代码 {result['html_bytes']} 字节")
+    print(f"🗜️ game_blobs: {result['blobs']} 条（去重后），压缩后共 {result['blob_bytes']} 字节")
+    print(f"💾 {path}: {before} -> {after} 字节，节省 {before - after} 字节"
+          + (f"（{(before - after) / before:.1%}）" if before else ""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import asyncio
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+
+from ttl_cache import TTLCache
+
+# --- 链接有效性检查 ---
+# 共享一个异步 HTTP 客户端（连接池复用），并限制对同一主机的并发请求数。
+# 检查结果按规范化后的 URL 缓存；连接层面的失败按主机缓存，同一主机的其它链接直接判定无效。
+URL_CHECK_TIMEOUT = float(os.environ.get("FUNAI_URL_CHECK_TIMEOUT", "5"))
+URL_CHECK_MAX_CONNECTIONS = int(os.environ.get("FUNAI_URL_CHECK_MAX_CONNECTIONS", "20"))
+URL_CHECK_PER_HOST = int(os.environ.get("FUNAI_URL_CHECK_PER_HOST", "2"))
+URL_CHECK_CACHE_TTL = float(os.environ.get("FUNAI_URL_CHECK_CACHE_TTL", "3600"))
+URL_CHECK_NEGATIVE_TTL = float(os.environ.get("FUNAI_URL_CHECK_NEGATIVE_TTL", "300"))
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url: str) -> str:
+    """统一大小写、去掉默认端口和锚点，作为缓存键"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+class UrlChecker:
+    def __init__(self, timeout: float, max_connections: int, per_host: int, cache_ttl: float, negative_ttl: float):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.negative_ttl = negative_ttl
+        self.results = TTLCache(cache_ttl, maxsize=4096)
+        self.unreachable_hosts = TTLCache(negative_ttl, maxsize=1024)
+        self._client = None
+        # 主机 -> [信号量, 使用中的检查数]；最后一个检查结束时删除，字典大小不超过进行中的主机数
+        self._host_semaphores = {}
+        self._inflight = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def check(self, url: str) -> bool:
+        key = normalize_url(url)
+        cached = self.results.get(key)
+        if cached is not None:
+            return cached
+
+        host = urlsplit(key).netloc
+        if self.unreachable_hosts.get(host):
+            return False
+
+        # 同一 URL 的并发检查只发一次请求
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._check_and_cache(key, host))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _check_and_cache(self, key: str, host: str) -> bool:
+        slot = self._host_semaphores.setdefault(host, [asyncio.Semaphore(self.per_host), 0])
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                try:
+                    valid = await self._probe(key)
+                except httpx.TransportError:
+                    # DNS、连接、超时等失败，短时间内同一主机不再重试
+                    self.unreachable_hosts.set(host, True)
+                    valid = False
+                except Exception:
+                    valid = False
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._host_semaphores[host]
+        self.results.set(key, valid, ttl=None if valid else self.negative_ttl)
+        return valid
+
+    async def _probe(self, url: str) -> bool:
+        client = self._get_client()
+        # 先尝试 HEAD 请求
+        try:
+            response = await client.head(url)
+            if response.status_code != 405:
+                return response.status_code < 400
+        except httpx.TransportError:
+            pass
+        # HEAD 失败或不被支持，改用 GET 且只读取前 1000 字节
+        async with client.stream("GET", url) as response:
+            async for _ in response.aiter_bytes(1000):
+                break
+            return response.status_code < 400
+
+    def stats(self) -> dict:
+        return {
+            "results": self.results.stats(),
+            "unreachable_hosts": self.unreachable_hosts.stats(),
+            "inflight": len(self._inflight),
+            "active_hosts": len(self._host_semaphores),
+        }
+
+url_checker = UrlChecker(URL_CHECK_TIMEOUT, URL_CHECK_MAX_CONNECTIONS, URL_CHECK_PER_HOST,
+                         URL_CHECK_CACHE_TTL, URL_CHECK_NEGATIVE_TTL)
@@ -1,46 +1,258 @@
 import os
 from sqlalchemy.orm import Session
 import re # 导入正则表达式模块
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+# fcntl 只在 POSIX 上可用，没有时只在进程内互斥
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # 从同级目录的 database.py 导入 SessionLocal 和 Game 模型
-from database import SessionLocal, Game
+from database import SessionLocal, Game, SyncManifest
+from content_cache import content_cache, CONTENT_CACHE_WARM_TOP_N
+from response_cache import response_cache
+from blob_store import hash_content, blob_fields, read_blob, release_blobs
 
 # --- 文件同步逻辑 ---
-def sync_games_from_folder():
-    db = SessionLocal()
+TITLE_PATTERN = re.compile(r"<title>(.*?)</title>", re.IGNORECASE)
+
+def extract_title(content: str, filename: str) -> str:
+    # 优先从 HTML 的 <title> 标签中提取标题
+    title_match = TITLE_PATTERN.search(content)
+    if title_match:
+        return title_match.group(1).strip()
+    # 如果没有 <title> 标签，再用文件名作为备选方案
+    return filename.replace(".html", "").replace("_", " ").title()
+
+def directory_size(directory: str) -> int:
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+# 启动同步、目录监听和手动刷新可能同时触发，多个 uvicorn worker 也各有一个目录监听；
+# 进程内用线程锁、进程间用文件锁逐个执行，避免重复插入同一文件
+_sync_lock = threading.Lock()
+SYNC_LOCK_PATH = os.environ.get("FUNAI_SYNC_LOCK", os.path.join(".build_cache", "games_repo_sync.lock"))
+# 每处理多少个文件回调一次进度
+SYNC_PROGRESS_EVERY = 100
+
+@contextmanager
+def games_repo_lock(wait: bool = True):
+    """获取 games_repo 同步锁，返回是否获得；wait=False 时锁被占用立即返回 False"""
+    if not _sync_lock.acquire(blocking=wait):
+        yield False
+        return
+    lock_file = None
+    try:
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(SYNC_LOCK_PATH) or ".", exist_ok=True)
+            lock_file = open(SYNC_LOCK_PATH, "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+        yield True
+    finally:
+        if lock_file:
+            lock_file.close()
+        _sync_lock.release()
+
+def write_game_file(filename: str, html_code: str):
+    """写入 games_repo 中的单文件游戏：先写临时文件再改名，目录监听只会看到完整的 .html"""
+    file_path = os.path.join("games_repo", filename)
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(html_code)
+    os.replace(temp_path, file_path)
+
+def sync_games_from_folder(filenames=None, progress=None):
+    """增量同步 games_repo 中的 .html 文件
+
+    size 和 mtime 与清单一致的文件直接跳过；其余文件读取并计算哈希，
+    内容确有变化时才写入 game_blobs 并更新游戏的内容哈希。传入 filenames 时只处理这些文件
+    （供目录监听使用）；传入 progress(processed, total) 时定期报告进度。
+    返回本次同步的统计结果。
+    """
+    with games_repo_lock():
+        return sync_games_from_folder_locked(filenames, progress)
+
+def sync_games_from_folder_locked(filenames=None, progress=None):
+    """与 sync_games_from_folder 相同，调用方需已持有 games_repo_lock"""
     folder = "games_repo"
+    summary = {"added": 0, "updated": 0, "unchanged": 0, "deleted": []}
     if not os.path.exists(folder):
         os.makedirs(folder)
-        return
+        return summary
+
+    on_disk = {}
+    if filenames is None:
+        print(f"🔄 正在扫描 {folder}...")
+        # 扫描所有 .html 文件，包括上传的和手动放入的，只做 stat
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(".html") and entry.is_file():
+                    stat = entry.stat()
+                    on_disk[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    else:
+        filenames = [name for name in set(filenames) if name.endswith(".html") and os.sep not in name]
+        for name in filenames:
+            path = os.path.join(folder, name)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                on_disk[name] = (stat.st_size, stat.st_mtime_ns)
+
+    db = SessionLocal()
+    try:
+        # 一次性加载清单和已有游戏的 filename -> id
+        manifest_query = db.query(SyncManifest)
+        existing_query = db.query(Game.filename, Game.id)
+        if filenames is not None:
+            manifest_query = manifest_query.filter(SyncManifest.filename.in_(filenames))
+            existing_query = existing_query.filter(Game.filename.in_(filenames))
+        manifest = {entry.filename: entry for entry in manifest_query.all()}
+        existing_ids = dict(existing_query.all())
+
+        # 没有清单记录的已有游戏（例如首次启用清单）需要比对数据库中的内容
+        unknown = [name for name in on_disk if name in existing_ids and name not in manifest]
+        stored_hashes = {}
+        if unknown:
+            rows = db.query(Game.filename, Game.content_hash, Game.html_code).filter(Game.filename.in_(unknown))
+            for filename, content_hash, html_code in rows:
+                stored_hashes[filename] = content_hash or hash_content(html_code or "")
+
+        new_games = []
+        changed_ids = []
+        replaced_hashes = []
+        for processed, (filename, (size, mtime_ns)) in enumerate(on_disk.items()):
+            if progress and processed % SYNC_PROGRESS_EVERY == 0:
+                progress(processed, len(on_disk))
+            entry = manifest.get(filename)
+            if entry and entry.size == size and entry.mtime_ns == mtime_ns and filename in existing_ids:
+                summary["unchanged"] += 1
+                continue
+
+            with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+                content = f.read()
+            content_hash = hash_content(content)
+            previous_hash = entry.content_hash if entry else stored_hashes.get(filename)
 
-    print(f"🔄 正在扫描 {folder}...")
-    # 扫描所有 .html 文件，包括上传的和手动放入的
-    files = [f for f in os.listdir(folder) if f.endswith(".html")]
-    
-    for filename in files:
-        path = os.path.join(folder, filename)
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
-        
-        existing = db.query(Game).filter(Game.filename == filename).first()
-        
-        if not existing:
-            # 优先从 HTML 的 <title> 标签中提取标题
-            title_match = re.search(r"<title>(.*?)</title>", content, re.IGNORECASE)
-            if title_match:
-                title = title_match.group(1).strip()
+            if filename not in existing_ids:
+                new_games.append(Game(
+                    title=extract_title(content, filename),
+                    description="暂无介绍",
+                    filename=filename,
+                    category_id=1,
+                    **blob_fields(db, content, content_hash)
+                ))
+                summary["added"] += 1
+            elif previous_hash != content_hash:
+                # 游戏已存在，仅当文件内容有变化时才更新游戏代码
+                # 这样可以避免不必要的数据库写入，并且不会覆盖上传时填写的标题等信息
+                game_id = existing_ids[filename]
+                replaced_hashes.append(db.query(Game.content_hash).filter(Game.id == game_id).scalar())
+                db.query(Game).filter(Game.id == game_id).update(
+                    blob_fields(db, content, content_hash), synchronize_session=False
+                )
+                changed_ids.append(game_id)
+                summary["updated"] += 1
             else:
-                # 如果没有 <title> 标签，再用文件名作为备选方案
-                title = filename.replace(".html", "").replace("_", " ").title()
-
-            new_game = Game(title=title, description="暂无介绍", filename=filename, html_code=content, category_id=1)
-            db.add(new_game)
-        else:
-            # 游戏已存在，仅当文件内容有变化时才更新数据库中的 html_code
-            # 这样可以避免不必要的数据库写入，并且不会覆盖上传时填写的标题等信息
-            if existing.html_code != content: 
-                existing.html_code = content
-    
-    db.commit()
-    db.close()
-    print("✅ 同步完成！")
\ No newline at end of file
+                summary["unchanged"] += 1
+
+            if entry:
+                entry.size, entry.mtime_ns, entry.content_hash = size, mtime_ns, content_hash
+            else:
+                db.add(SyncManifest(filename=filename, size=size, mtime_ns=mtime_ns, content_hash=content_hash))
+
+        # 新游戏批量插入
+        if new_games:
+            db.add_all(new_games)
+
+        # 清单中有但磁盘上已不存在的文件：只报告并移除清单记录，不删除游戏
+        for filename in manifest.keys() - on_disk.keys():
+            db.delete(manifest[filename])
+            summary["deleted"].append(filename)
+
+        db.flush()
+        release_blobs(db, *replaced_hashes)
+        db.commit()
+    finally:
+        db.close()
+
+    if progress:
+        progress(len(on_disk), len(on_disk))
+    content_cache.invalidate(*changed_ids)
+    if summary["added"] or summary["updated"]:
+        response_cache.clear()
+    if summary["deleted"]:
+        print(f"⚠️ 以下文件已从 {folder} 删除: {', '.join(sorted(summary['deleted']))}")
+    print(f"✅ 同步完成！新增 {summary['added']}，更新 {summary['updated']}，未变化 {summary['unchanged']}")
+    return summary
+
+# --- 游戏内容读取 ---
+HEAD_TAG_PATTERN = re.compile(r'(<head[^>]*>)', re.IGNORECASE)
+
+def load_multi_file_index(directory_name: str) -> str:
+    """读取多文件游戏的 index.html，并注入 base 标签以修复资源路径问题
+
+    改写结果按 (路径, mtime, size) 缓存，文件未变化时只需一次 stat。
+    """
+    index_file_path = os.path.join("games_repo", directory_name, "index.html")
+    stat = os.stat(index_file_path)
+    return _render_multi_file_index(index_file_path, directory_name, stat.st_mtime_ns, stat.st_size)
+
+@lru_cache(maxsize=256)
+def _render_multi_file_index(index_file_path: str, directory_name: str, mtime_ns: int, size: int) -> str:
+    with open(index_file_path, "r", encoding="utf-8") as f:
+        html_content = f.read()
+
+    # 在 <head> 标签后注入 <base> 标签，确保所有路径相对于游戏目录解析
+    base_tag = f'<base href="/repo/{directory_name}/">'
+
+    # 查找 <head> 标签并在其后插入 base 标签
+    match = HEAD_TAG_PATTERN.search(html_content)
+
+    if match:
+        insert_pos = match.end()
+        return html_content[:insert_pos] + '\n    ' + base_tag + html_content[insert_pos:]
+    return base_tag + '\n' + html_content
+
+def load_game_html(db: Session, game: Game) -> str:
+    """返回 /content 需要输出的游戏 HTML；尚未迁移到 game_blobs 的游戏直接使用 html_code"""
+    if game.is_multi_file:
+        return load_multi_file_index(game.directory_name)
+    if game.content_hash:
+        return read_blob(db, game.content_hash)
+    return game.html_code or ""
+
+def warm_content_cache(top_n: int = CONTENT_CACHE_WARM_TOP_N):
+    """按浏览量预热前 top_n 个游戏的内容缓存"""
+    if top_n <= 0:
+        return
+    db = SessionLocal()
+    try:
+        game_ids = [game_id for game_id, in db.query(Game.id).order_by(Game.views.desc()).limit(top_n)]
+        warmed = 0
+        for game_id in game_ids:
+            # 先取失效计数再读取内容，期间被编辑或删除的游戏不会写入旧内容
+            generation = content_cache.generation(game_id)
+            game = db.get(Game, game_id)
+            if game is None:
+                continue
+            try:
+                content_cache.put(game.id, load_game_html(db, game), generation)
+                warmed += 1
+            except OSError as e:
+                print(f"预热游戏 {game.id} 失败: {e}")
+    finally:
+        db.close()
+    print(f"🔥 已预热 {warmed} 个游戏内容")
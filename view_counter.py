@@ -0,0 +1,126 @@
+import os
+import time
+import asyncio
+import threading
+from sqlalchemy import update, bindparam
+
+from database import engine, Game
+from leaderboard_rollup import record_daily_stats
+
+# --- 浏览量写回缓冲 ---
+# /play 不再每次访问都写库：浏览量先累加在内存里，由后台任务按间隔批量写回。
+# 进程异常退出时最多丢失 VIEW_FLUSH_INTERVAL 秒或 VIEW_FLUSH_MAX_PENDING 次浏览。
+VIEW_FLUSH_INTERVAL = float(os.environ.get("FUNAI_VIEW_FLUSH_INTERVAL", "5"))
+VIEW_FLUSH_MAX_PENDING = int(os.environ.get("FUNAI_VIEW_FLUSH_MAX_PENDING", "1000"))
+
+games_table = Game.__table__
+_flush_statement = (
+    update(games_table)
+    .where(games_table.c.id == bindparam("game_id"))
+    .values(views=games_table.c.views + bindparam("delta"))
+)
+
+class ViewCounter:
+    """按游戏ID累加浏览量，并以一条批量 UPDATE 写回数据库"""
+
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._pending_total = 0
+        self._oldest_pending_at = None
+        self._last_flush_at = time.monotonic()
+
+        # 统计信息
+        self.flush_count = 0
+        self.flushed_views = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.last_error = None
+
+    def incr(self, game_id: int, delta: int = 1):
+        with self._lock:
+            self._pending[game_id] = self._pending.get(game_id, 0) + delta
+            self._pending_total += delta
+            if self._oldest_pending_at is None:
+                self._oldest_pending_at = time.monotonic()
+
+    def should_flush(self) -> bool:
+        with self._lock:
+            if not self._pending:
+                return False
+            if self._pending_total >= self.max_pending:
+                return True
+        return time.monotonic() - self._last_flush_at >= self.flush_interval
+
+    def flush(self) -> int:
+        """把缓冲的浏览量写回数据库，返回写回的浏览次数"""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                total = self._pending_total
+                self._pending = {}
+                self._pending_total = 0
+                self._oldest_pending_at = None
+                self._last_flush_at = time.monotonic()
+
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        _flush_statement,
+                        [{"game_id": game_id, "delta": delta} for game_id, delta in batch.items()]
+                    )
+                    # 同一事务内累加排行榜的按天汇总
+                    record_daily_stats(conn, [{"game_id": game_id, "views": delta} for game_id, delta in batch.items()])
+            except Exception as e:
+                # 写回失败时把增量放回缓冲区，等待下一次重试
+                with self._lock:
+                    for game_id, delta in batch.items():
+                        self._pending[game_id] = self._pending.get(game_id, 0) + delta
+                    self._pending_total += total
+                    if self._oldest_pending_at is None:
+                        self._oldest_pending_at = time.monotonic()
+                self.failed_flushes += 1
+                self.last_error = str(e)
+                print(f"⚠️ 浏览量写回失败: {e}")
+                return 0
+
+            self.flush_count += 1
+            self.flushed_views += total
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.last_error = None
+            return total
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending_games = len(self._pending)
+            pending_views = self._pending_total
+            oldest_age = time.monotonic() - self._oldest_pending_at if self._oldest_pending_at else 0.0
+        return {
+            "flush_interval": self.flush_interval,
+            "max_pending": self.max_pending,
+            "pending_games": pending_games,
+            "pending_views": pending_views,
+            "oldest_pending_age": round(oldest_age, 2),
+            "flush_count": self.flush_count,
+            "flushed_views": self.flushed_views,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": self.last_flush_ms,
+            "last_error": self.last_error,
+        }
+
+    async def run(self):
+        """后台写回循环，由 main.py 的 lifespan 启动"""
+        tick = min(self.flush_interval, 1.0)
+        while True:
+            await asyncio.sleep(tick)
+            if self.should_flush():
+                await asyncio.to_thread(self.flush)
+
+view_counter = ViewCounter(VIEW_FLUSH_INTERVAL, VIEW_FLUSH_MAX_PENDING)
@@ -0,0 +1,131 @@
+import os
+import zipfile
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+# --- ZIP 上传的流式保存与安全解压 ---
+# 上传大小在解析表单前检查，解压时逐个条目流式写出，并限制总解压大小、条目数量和压缩比（防 zip 炸弹）。
+ZIP_MAX_UPLOAD_BYTES = int(os.environ.get("FUNAI_ZIP_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+ZIP_MAX_UNCOMPRESSED_BYTES = int(os.environ.get("FUNAI_ZIP_MAX_UNCOMPRESSED_BYTES", str(500 * 1024 * 1024)))
+ZIP_MAX_ENTRIES = int(os.environ.get("FUNAI_ZIP_MAX_ENTRIES", "5000"))
+ZIP_MAX_RATIO = float(os.environ.get("FUNAI_ZIP_MAX_RATIO", "100"))
+# 小于该大小的条目不检查单条压缩比（小文件的压缩比天然可能很高）
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+# 整个上传请求体的上限：ZIP 大小上限加上表单字段和 multipart 分隔符的余量
+UPLOAD_FORM_OVERHEAD = 1024 * 1024
+
+class ZipLimitError(ValueError):
+    """ZIP 文件超出限制或内容不安全"""
+
+class UploadSizeLimitMiddleware:
+    """在解析表单之前限制上传请求体大小：Content-Length 超限时直接返回 413，不读取请求体；
+    没有 Content-Length（分块传输）时边接收边计数，超限立即中止，不再继续写入临时文件"""
+
+    def __init__(self, app, paths=("/upload",), max_bytes: int = ZIP_MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"上传内容超过 {self.max_bytes // (1024 * 1024)} MB 限制"
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse({"detail": detail}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+def detach_upload(source, max_bytes: int = ZIP_MAX_UPLOAD_BYTES):
+    """接管 Starlette 已写入临时文件的上传内容，返回独立的只读文件对象，不再复制一遍。
+    请求结束时 UploadFile 会被关闭，这里复制的是文件描述符；临时文件已删除，最后一个描述符关闭后自动回收"""
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    if size > max_bytes:
+        raise ZipLimitError(f"上传文件超过 {max_bytes // (1024 * 1024)} MB 限制")
+    # 仍在内存中的小文件（不超过 1 MB）fileno() 时会先落盘
+    source.flush()
+    detached = os.fdopen(os.dup(source.fileno()), "rb")
+    detached.seek(0)
+    return detached
+
+def archive_size(source) -> int:
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+def inspect_zip(zip_path):
+    """只读取中央目录，按声明的大小提前拒绝明显超限的压缩包；zip_path 可以是路径或已打开的文件对象"""
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            infos = zip_ref.infolist()
+    except zipfile.BadZipFile as e:
+        raise ZipLimitError(f"无效的 ZIP 文件: {e}")
+
+    if len(infos) > ZIP_MAX_ENTRIES:
+        raise ZipLimitError(f"ZIP 条目数量超过 {ZIP_MAX_ENTRIES} 个")
+
+    total = sum(info.file_size for info in infos)
+    if total > ZIP_MAX_UNCOMPRESSED_BYTES:
+        raise ZipLimitError(f"ZIP 解压后大小超过 {ZIP_MAX_UNCOMPRESSED_BYTES // (1024 * 1024)} MB 限制")
+
+    compressed = max(archive_size(zip_path), 1)
+    if total > RATIO_CHECK_MIN_BYTES and total / compressed > ZIP_MAX_RATIO:
+        raise ZipLimitError("ZIP 压缩比异常，疑似 zip 炸弹")
+    for info in infos:
+        if info.file_size > RATIO_CHECK_MIN_BYTES and info.file_size / max(info.compress_size, 1) > ZIP_MAX_RATIO:
+            raise ZipLimitError(f"ZIP 条目 {info.filename} 压缩比异常，疑似 zip 炸弹")
+    return infos
+
+def safe_extract_zip(zip_path, dest: str) -> int:
+    """逐个条目流式解压到 dest，按实际写出的字节数执行限制，返回解压总字节数"""
+    inspect_zip(zip_path)
+    dest_root = os.path.realpath(dest)
+    total = 0
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            target = os.path.realpath(os.path.join(dest_root, info.filename))
+            if target != dest_root and not target.startswith(dest_root + os.sep):
+                raise ZipLimitError(f"ZIP 条目路径不安全: {info.filename}")
+
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # 不信任条目头中声明的大小，按实际解压出的字节计数
+            entry_written = 0
+            with zip_ref.open(info) as source, open(target, "wb") as out:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    entry_written += len(chunk)
+                    total += len(chunk)
+                    if total > ZIP_MAX_UNCOMPRESSED_BYTES:
+                        raise ZipLimitError(f"ZIP 解压后大小超过 {ZIP_MAX_UNCOMPRESSED_BYTES // (1024 * 1024)} MB 限制")
+                    if entry_written > RATIO_CHECK_MIN_BYTES and entry_written / max(info.compress_size, 1) > ZIP_MAX_RATIO:
+                        raise ZipLimitError(f"ZIP 条目 {info.filename} 压缩比异常，疑似 zip 炸弹")
+                    out.write(chunk)
+    return total